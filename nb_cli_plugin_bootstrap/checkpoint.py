@@ -0,0 +1,65 @@
+from contextlib import suppress
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Literal, Optional
+
+from cookit.pyd import type_dump_json, type_validate_json
+from pydantic import BaseModel
+
+from .const import PROJECT_STATE_DIR_NAME
+from .fs import atomic_write_text
+
+STATE_FILE_NAME = "state.json"
+
+# 启用内置插件是最后一步，完成后直接删除记录
+BootstrapStep = Literal["render", "venv", "lock", "install"]
+
+
+class BootstrapState(BaseModel):
+    variables: dict[str, Any] = {}
+    packages: list[str] = []
+    use_venv: Optional[bool] = None
+    venv_backend: Optional[str] = None
+    lock: bool = False
+    golden: bool = False
+    steps: list[BootstrapStep] = []
+
+
+@dataclass
+class Checkpoint:
+    project_dir: Path
+    state: BootstrapState
+    resumed: bool = False
+
+    @property
+    def path(self) -> Path:
+        return self.project_dir / PROJECT_STATE_DIR_NAME / STATE_FILE_NAME
+
+    @classmethod
+    def load(cls, project_dir: Path) -> Optional["Checkpoint"]:
+        path = project_dir / PROJECT_STATE_DIR_NAME / STATE_FILE_NAME
+        try:
+            state = type_validate_json(BootstrapState, path.read_text("u8"))
+        except Exception:
+            return None
+        return cls(project_dir, state, resumed=True)
+
+    def save(self):
+        try:
+            atomic_write_text(self.path, type_dump_json(self.state))
+        except OSError:
+            pass  # 只影响之后能否继续，不影响本次创建
+
+    def done(self, step: BootstrapStep) -> bool:
+        return step in self.state.steps
+
+    def mark(self, step: BootstrapStep):
+        if step not in self.state.steps:
+            self.state.steps.append(step)
+        self.save()
+
+    # 文件夹中还有更新历史等，只删除自己的记录
+    def clear(self):
+        with suppress(OSError):
+            self.path.unlink(missing_ok=True)
+            self.path.parent.rmdir()  # 没有其他内容时顺便删除文件夹
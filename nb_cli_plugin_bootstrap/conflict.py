@@ -0,0 +1,105 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .mirrors import run_with_failover
+from .trace import packages_label, span_label
+from .utils import is_network_error_output, parse_conflict_detail, resolve_packages
+
+
+@dataclass
+class Conflict:
+    packages: list[str]
+    detail: Optional[str] = None
+
+
+@dataclass
+class BisectResult:
+    resolved: list[str] = field(default_factory=list)
+    conflicts: list[Conflict] = field(default_factory=list)
+
+
+class ConflictBisector:
+    def __init__(self, python_path: str, jobs: int = 4):
+        self.python_path = python_path
+        self._semaphore = asyncio.Semaphore(jobs)
+        self._results: dict[frozenset[str], asyncio.Task[tuple[bool, str]]] = {}
+
+    async def _resolve(self, packages: list[str]) -> tuple[bool, str]:
+        async with self._semaphore:
+            with span_label(packages_label(packages)):
+                code, _, stderr = await run_with_failover(
+                    lambda index_url: resolve_packages(
+                        *packages,
+                        python_path=self.python_path,
+                        index_url=index_url,
+                    ),
+                    lambda x: x[0] != 0 and is_network_error_output(x[2]),
+                )
+        return code == 0, stderr
+
+    async def check(self, packages: list[str]) -> tuple[bool, str]:
+        if not packages:
+            return True, ""
+        key = frozenset(packages)
+        if key not in self._results:
+            self._results[key] = asyncio.create_task(self._resolve(packages))
+        return await self._results[key]
+
+    # 二分查找使 base + candidates[:i + 1] 解析失败的最小 i
+    async def find_culprit(self, candidates: list[str], base: list[str]) -> str:
+        low, high = 0, len(candidates) - 1
+        while low < high:
+            mid = (low + high) // 2
+            ok, _ = await self.check([*base, *candidates[: mid + 1]])
+            if ok:
+                low = mid + 1
+            else:
+                high = mid
+        return candidates[low]
+
+    # 找出与 base 冲突的 candidates 最小子集
+    async def minimize(self, candidates: list[str], base: list[str]) -> list[str]:
+        found: list[str] = []
+        pool = candidates
+        while pool and (await self.check([*base, *found]))[0]:
+            culprit = await self.find_culprit(pool, [*base, *found])
+            found.append(culprit)
+            pool = pool[: pool.index(culprit)]
+        return found
+
+    async def merge(
+        self,
+        left: list[str],
+        right: list[str],
+        conflicts: list[Conflict],
+    ) -> BisectResult:
+        while left and right and not (await self.check([*left, *right]))[0]:
+            right_part = await self.minimize(right, left)
+            left_part = await self.minimize(left, right_part)
+            packages = [*left_part, *right_part]
+            _, stderr = await self.check(packages)
+            conflicts.append(Conflict(packages, parse_conflict_detail(stderr)))
+            left = [x for x in left if x not in left_part]
+            right = [x for x in right if x not in right_part]
+        return BisectResult([*left, *right], conflicts)
+
+    async def bisect(self, packages: list[str]) -> BisectResult:
+        ok, stderr = await self.check(packages)
+        if ok:
+            return BisectResult(packages.copy())
+        if len(packages) == 1:
+            return BisectResult(
+                conflicts=[Conflict(packages.copy(), parse_conflict_detail(stderr))],
+            )
+
+        mid = len(packages) // 2
+        left, right = await asyncio.gather(
+            self.bisect(packages[:mid]),
+            self.bisect(packages[mid:]),
+        )
+        return await self.merge(
+            left.resolved,
+            right.resolved,
+            [*left.conflicts, *right.conflicts],
+        )
@@ -1 +1,14 @@
+from nb_cli.handlers.data import CACHE_DIR as NB_CLI_CACHE_DIR
+from nb_cli.handlers.data import CONFIG_DIR as NB_CLI_CONFIG_DIR
+
 INPUT_QUESTION = "请输入 > "
+
+CACHE_DIR = NB_CLI_CACHE_DIR / "plugin-bootstrap"
+CONFIG_DIR = NB_CLI_CONFIG_DIR / "plugin-bootstrap"
+
+LOCKFILE_NAME = "requirements.lock"
+# 项目中保存创建进度、更新历史等状态的文件夹
+PROJECT_STATE_DIR_NAME = ".nb-bootstrap"
+
+# 与 venv_backends.VENV_BACKENDS 保持一致，放在这里避免命令行加载时导入过多模块
+VENV_BACKEND_NAMES = ("uv", "virtualenv", "venv")
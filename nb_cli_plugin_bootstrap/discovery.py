@@ -0,0 +1,180 @@
+import asyncio
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from cookit.pyd import type_dump_json, type_validate_json
+from pydantic import BaseModel
+
+from .const import CACHE_DIR
+from .fs import atomic_write_text
+from .trace import finish_process, trace_process
+
+TOOLS_CACHE_PATH = CACHE_DIR / "tools.json"
+# 这些环境变量会影响查找和探测的结果，变化时整个缓存作废
+CACHE_ENV_KEYS = ("PATH", "PYTHONPATH", "UV_PYTHON_INSTALL_DIR")
+
+
+class ExecutableInfo(BaseModel):
+    path: Optional[str] = None  # 为空表示没有找到
+    mtime: Optional[float] = None
+    size: Optional[int] = None
+    values: dict[str, str] = {}
+
+    @property
+    def key(self) -> tuple[Optional[str], Optional[float], Optional[int]]:
+        return self.path, self.mtime, self.size
+
+
+class ToolsCache(BaseModel):
+    env: dict[str, str] = {}
+    tools: dict[str, ExecutableInfo] = {}
+    interpreters: dict[str, ExecutableInfo] = {}
+
+
+_tools_cache: Optional[ToolsCache] = None
+_probing: dict[tuple[str, str], "asyncio.Task[Optional[str]]"] = {}
+
+
+def get_cache_env() -> dict[str, str]:
+    return {k: os.getenv(k, "") for k in CACHE_ENV_KEYS}
+
+
+def load_tools_cache() -> ToolsCache:
+    global _tools_cache
+    if _tools_cache is not None:
+        return _tools_cache
+
+    env = get_cache_env()
+    try:
+        cache = type_validate_json(ToolsCache, TOOLS_CACHE_PATH.read_text("u8"))
+    except Exception:
+        cache = None
+    if (not cache) or cache.env != env:
+        cache = ToolsCache(env=env)
+    _tools_cache = cache
+    return cache
+
+
+def save_tools_cache():
+    if _tools_cache is None:
+        return
+    try:
+        atomic_write_text(TOOLS_CACHE_PATH, type_dump_json(_tools_cache))
+    except OSError:
+        pass  # 缓存写不进去也不影响使用
+
+
+def stat_executable(path: Optional[str], *extra: Path) -> ExecutableInfo:
+    if not path:
+        return ExecutableInfo()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return ExecutableInfo()
+    mtimes = [stat.st_mtime]
+    for p in extra:
+        try:
+            mtimes.append(p.stat().st_mtime)
+        except OSError:
+            pass
+    return ExecutableInfo(path=path, mtime=max(mtimes), size=stat.st_size)
+
+
+def lookup_executable(
+    table: dict[str, ExecutableInfo],
+    name: str,
+    current: ExecutableInfo,
+) -> ExecutableInfo:
+    cached = table.get(name)
+    if cached and cached.key == current.key:
+        return cached
+    table[name] = current
+    save_tools_cache()
+    return current
+
+
+# 只查 PATH，不会启动子进程
+def find_tool(name: str) -> ExecutableInfo:
+    return lookup_executable(
+        load_tools_cache().tools,
+        name,
+        stat_executable(shutil.which(name)),
+    )
+
+
+def find_interpreter(python_path: str) -> ExecutableInfo:
+    path = shutil.which(python_path)
+    # 虚拟环境中的解释器一般是软链接，重建虚拟环境时只有 pyvenv.cfg 会变
+    extra = [Path(path).parent.parent / "pyvenv.cfg"] if path else []
+    return lookup_executable(
+        load_tools_cache().interpreters,
+        python_path,
+        stat_executable(path, *extra),
+    )
+
+
+async def run_probe(
+    path: str,
+    *args: str,
+    timeout: Optional[float] = None,
+) -> Optional[str]:
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *(path, *args),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except OSError:
+        return None
+    trace_process(proc, [path, *args])
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        finish_process(proc, -1, 0)
+        raise
+    code = proc.returncode or 0
+    finish_process(proc, code, len(stdout) + len(stderr))
+    if code != 0:
+        return None
+    return stdout.decode("u8", errors="replace").strip()
+
+
+async def probe(info: ExecutableInfo, key: str, *args: str) -> Optional[str]:
+    if not info.path:
+        return None
+    if key in info.values:
+        return info.values[key]
+
+    # 并发调用时只启动一次子进程
+    task_key = (info.path, key)
+    if not (task := _probing.get(task_key)):
+        task = _probing[task_key] = asyncio.create_task(run_probe(info.path, *args))
+    try:
+        value = await task
+    finally:
+        _probing.pop(task_key, None)
+
+    if value is not None:
+        store_value(info, key, value)
+    return value
+
+
+# 键中 @ 后是校验值，同名的旧值直接丢弃
+def store_value(info: ExecutableInfo, key: str, value: str):
+    name = key.partition("@")[0]
+    for old_key in [x for x in info.values if x.partition("@")[0] == name]:
+        del info.values[old_key]
+    info.values[key] = value
+    save_tools_cache()
+
+
+def get_stored_value(info: ExecutableInfo, name: str) -> Optional[str]:
+    return next(
+        (v for k, v in info.values.items() if k.partition("@")[0] == name),
+        None,
+    )
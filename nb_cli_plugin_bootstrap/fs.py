@@ -0,0 +1,16 @@
+import os
+from contextlib import suppress
+from pathlib import Path
+
+
+# 先写入带进程号后缀的临时文件再替换，并发写入或中途退出时不会留下不完整的文件
+def atomic_write_text(path: Path, text: str):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        tmp_path.write_text(text, "u8")
+        os.replace(tmp_path, path)
+    except OSError:
+        with suppress(OSError):
+            tmp_path.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,304 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Optional
+
+from cookit.pyd import type_dump_json, type_validate_json
+from nb_cli.consts import WINDOWS
+from pydantic import BaseModel
+
+from .const import CACHE_DIR
+from .install import install_packages
+from .trace import span_label
+from .venv_backends import get_venv_python, select_venv_backends
+from .wheelhouse import WHEELHOUSE_DIR
+
+GOLDEN_DIR = CACHE_DIR / "golden"
+GOLDEN_META_NAME = "golden.json"
+GOLDEN_LIMIT = 5
+GOLDEN_BUILD_TIMEOUT = 60 * 60
+# 按创建时间过期，经常使用的环境也会定期重建，避免一直装着旧版本的包
+GOLDEN_TTL = 7 * 24 * 60 * 60
+
+_building: dict[str, "asyncio.Task[Optional[tuple[Path, GoldenMeta]]]"] = {}
+
+
+class GoldenMeta(BaseModel):
+    python: str
+    python_mtime: float
+    python_size: int
+    packages: list[str]
+    prompt: str
+    created: float = 0  # 旧版本没有记录，视为已过期
+
+
+def get_python_identity(python_path: str) -> Optional[tuple[str, float, int]]:
+    path = shutil.which(python_path)
+    if not path:
+        return None
+    path = os.path.realpath(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return path, stat.st_mtime, stat.st_size
+
+
+def get_golden_key(identity: tuple[str, float, int], packages: list[str]) -> str:
+    data = "\n".join([*map(str, identity), *sorted(set(packages))])
+    return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+
+def is_golden_expired(meta: GoldenMeta) -> bool:
+    return time.time() - meta.created > GOLDEN_TTL
+
+
+def load_golden_meta(golden_dir: Path) -> Optional[GoldenMeta]:
+    try:
+        return type_validate_json(
+            GoldenMeta,
+            (golden_dir / GOLDEN_META_NAME).read_text("u8"),
+        )
+    except Exception:
+        return None
+
+
+# 只选择包集合是所需子集的环境，多出来的包不好卸干净
+def find_golden(
+    identity: tuple[str, float, int],
+    packages: list[str],
+) -> Optional[tuple[Path, GoldenMeta]]:
+    if not GOLDEN_DIR.is_dir():
+        return None
+    requested = set(packages)
+    best: Optional[tuple[Path, GoldenMeta]] = None
+    for golden_dir in sorted(GOLDEN_DIR.iterdir()):
+        meta = load_golden_meta(golden_dir)
+        if (
+            (not meta)
+            or (meta.python, meta.python_mtime, meta.python_size) != identity
+            or (not set(meta.packages) <= requested)
+            or is_golden_expired(meta)
+        ):
+            continue
+        if (not best) or len(meta.packages) > len(best[1].packages):
+            best = golden_dir, meta
+    return best
+
+
+def prune_goldens(keep: int = GOLDEN_LIMIT):
+    dirs: list[Path] = []
+    for golden_dir in GOLDEN_DIR.iterdir():
+        if not (meta := load_golden_meta(golden_dir)):
+            continue
+        if is_golden_expired(meta):
+            shutil.rmtree(golden_dir, ignore_errors=True)
+        else:
+            dirs.append(golden_dir)
+    dirs.sort(key=lambda x: (x / GOLDEN_META_NAME).stat().st_mtime, reverse=True)
+    for golden_dir in dirs[keep:]:
+        shutil.rmtree(golden_dir, ignore_errors=True)
+
+
+# pip 与 uv 在覆盖文件前都会先删除旧文件，所以硬链接出来的文件不会改到缓存里的环境
+def link_or_copy(src: Path, dst: Path, can_link: list[bool]):
+    if can_link[0]:
+        try:
+            os.link(src, dst)
+        except OSError:
+            can_link[0] = False  # 跨文件系统等情况，之后都直接复制
+        else:
+            return
+    shutil.copy2(src, dst)
+
+
+def rewrite_file(src: Path, dst: Path, replacements: dict[bytes, bytes]) -> bool:
+    data = src.read_bytes()
+    new_data = data
+    for old, new in replacements.items():
+        new_data = new_data.replace(old, new)
+    if new_data == data:
+        return False
+    dst.write_bytes(new_data)
+    shutil.copymode(src, dst)
+    return True
+
+
+# 虚拟环境中只有脚本目录与 pyvenv.cfg 里写死了绝对路径和提示符
+def clone_venv(src_dir: Path, dst_dir: Path, replacements: dict[str, str]):
+    scripts_dir = src_dir / "bin"
+    byte_replacements = {
+        old.encode(): new.encode() for old, new in replacements.items() if old != new
+    }
+    can_link = [True]
+    for root, dirs, files in os.walk(src_dir):
+        root_path = Path(root)
+        target_root = dst_dir / root_path.relative_to(src_dir)
+        target_root.mkdir(parents=True, exist_ok=True)
+        for name in [*dirs, *files]:
+            src = root_path / name
+            dst = target_root / name
+            if src.is_symlink():
+                os.symlink(os.readlink(src), dst)
+                if name in dirs:
+                    dirs.remove(name)
+                continue
+            if name in dirs:
+                continue
+            if (root_path == scripts_dir or src.name == "pyvenv.cfg") and rewrite_file(
+                src,
+                dst,
+                byte_replacements,
+            ):
+                continue
+            link_or_copy(src, dst, can_link)
+
+
+def get_clone_replacements(
+    src_dir: Path,
+    dst_dir: Path,
+    src_prompt: str,
+    dst_prompt: str,
+) -> dict[str, str]:
+    return {str(src_dir): str(dst_dir), src_prompt: dst_prompt}
+
+
+async def create_golden_venv(
+    venv_dir: Path,
+    python_path: str,
+    prompt: str,
+    venv_backend: Optional[str] = None,
+) -> bool:
+    for backend in await select_venv_backends(venv_backend):
+        try:
+            await backend.create(venv_dir, python_path, prompt)
+        except Exception:
+            shutil.rmtree(venv_dir, ignore_errors=True)
+        else:
+            return True
+    return False
+
+
+async def build_golden(
+    identity: tuple[str, float, int],
+    python_path: str,
+    packages: list[str],
+    jobs: int = 4,
+    wheelhouse: Optional[Path] = WHEELHOUSE_DIR,
+    venv_backend: Optional[str] = None,
+) -> Optional[tuple[Path, GoldenMeta]]:
+    key = get_golden_key(identity, packages)
+    golden_dir = GOLDEN_DIR / key
+    GOLDEN_DIR.mkdir(parents=True, exist_ok=True)
+    if (meta := load_golden_meta(golden_dir)) and is_golden_expired(meta):
+        shutil.rmtree(golden_dir, ignore_errors=True)
+    try:
+        golden_dir.mkdir()  # 同时只让一个进程构建
+    except FileExistsError:
+        if meta := load_golden_meta(golden_dir):
+            return golden_dir, meta
+        # 其他进程正在构建，或者上次构建到一半就退出了
+        if time.time() - golden_dir.stat().st_mtime > GOLDEN_BUILD_TIMEOUT:
+            shutil.rmtree(golden_dir, ignore_errors=True)
+        return None
+
+    meta = GoldenMeta(
+        python=identity[0],
+        python_mtime=identity[1],
+        python_size=identity[2],
+        packages=sorted(set(packages)),
+        prompt=f"nb-golden-{key}",
+        created=time.time(),
+    )
+    venv_dir = golden_dir / ".venv"
+    with span_label("golden"):
+        ok = await create_golden_venv(
+            venv_dir,
+            python_path,
+            meta.prompt,
+            venv_backend,
+        )
+        if ok:
+            code, *_ = await install_packages(
+                packages,
+                python_path=get_venv_python(venv_dir),
+                jobs=jobs,
+                wheelhouse=wheelhouse,
+            )
+            ok = code == 0
+    if not ok:
+        shutil.rmtree(golden_dir, ignore_errors=True)
+        return None
+
+    (golden_dir / GOLDEN_META_NAME).write_text(type_dump_json(meta), "u8")
+    prune_goldens()
+    return golden_dir, meta
+
+
+# 返回 None 表示无法使用缓存的环境，需要按原来的方式创建
+# Windows 下 Scripts 中的 exe 启动器内嵌了解释器路径，无法安全地改写，不使用克隆
+async def create_venv_from_golden(
+    venv_dir: Path,
+    prompt: str,
+    python_path: str,
+    packages: list[str],
+    jobs: int = 4,
+    wheelhouse: Optional[Path] = WHEELHOUSE_DIR,
+    venv_backend: Optional[str] = None,
+) -> Optional[tuple[int, str, list[str]]]:
+    if WINDOWS:
+        return None
+    identity = get_python_identity(python_path)
+    if not identity:
+        return None
+
+    golden = find_golden(identity, packages)
+    if not golden:
+        # 同一进程中批量创建项目时，相同的环境只构建一次
+        key = get_golden_key(identity, packages)
+        if not (task := _building.get(key)):
+            task = _building[key] = asyncio.create_task(
+                build_golden(
+                    identity,
+                    python_path,
+                    packages,
+                    jobs=jobs,
+                    wheelhouse=wheelhouse,
+                    venv_backend=venv_backend,
+                ),
+            )
+        try:
+            golden = await task
+        finally:
+            _building.pop(key, None)
+    if not golden:
+        return None
+    golden_dir, meta = golden
+    os.utime(golden_dir / GOLDEN_META_NAME)  # 记录最近使用时间
+
+    src_dir = golden_dir / ".venv"
+    with span_label("clone"):
+        try:
+            await asyncio.to_thread(
+                clone_venv,
+                src_dir,
+                venv_dir,
+                get_clone_replacements(src_dir, venv_dir, meta.prompt, prompt),
+            )
+        except OSError:
+            shutil.rmtree(venv_dir, ignore_errors=True)
+            return None
+
+    missing = [x for x in packages if x not in meta.packages]
+    if not missing:
+        return 0, "", []
+    code, _, stderr, _ = await install_packages(
+        missing,
+        python_path=get_venv_python(venv_dir),
+        jobs=jobs,
+        wheelhouse=wheelhouse,
+    )
+    return code, stderr, missing
@@ -0,0 +1,391 @@
+import asyncio
+import json
+import shutil
+import sys
+import time
+import traceback
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import click
+from cookit.pyd import model_dump
+from nb_cli.cli.commands.project import ProjectContext, project_name_validator
+from nb_cli.config.parser import ConfigManager
+from nb_cli.consts import WINDOWS
+from nb_cli.handlers import get_default_python
+
+from ..golden import create_venv_from_golden
+from ..install import install_packages, install_with_report
+from ..lockfile import get_lockfile_path, lock_project, sync_lockfile
+from ..registry import AdapterIndex, AmbiguousAdapterError, load_adapters
+from ..report import InstallReport
+from ..spec import ProjectSpec, load_spec
+from ..trace import packages_label, span_label, tracing
+from ..utils import spool_output, use_uv
+from ..venv_backends import get_venv_python
+from ..wheelhouse import WHEELHOUSE_DIR, fill_wheelhouse
+from .bootstrap import (
+    create_venv_with_backends,
+    discover_interpreters,
+    filter_venv_interpreters,
+    format_project_folder_name,
+    render_project,
+)
+
+
+@dataclass
+class ProjectResult:
+    name: str
+    success: bool = False
+    message: str = ""
+    timings: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def elapsed(self) -> float:
+        return sum(self.timings.values())
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+
+# 所有项目共用同一个 wheelhouse，相同依赖的项目只解析一次
+@dataclass
+class SharedResolution:
+    jobs: int = 4
+    wheelhouse: Optional[Path] = WHEELHOUSE_DIR
+    prefetched: set[str] = field(default_factory=set)
+    locks: dict[tuple[str, ...], "asyncio.Task[tuple[int, str, Path]]"] = field(
+        default_factory=dict,
+    )
+
+    async def prefetch(self, packages: list[str], python_path: Optional[str]):
+        if (not self.wheelhouse) or await use_uv():
+            return
+        failed = await fill_wheelhouse(
+            packages,
+            self.wheelhouse,
+            python_path,
+            jobs=self.jobs,
+        )
+        self.prefetched.update(x for x in packages if x not in failed)
+
+    async def install(
+        self,
+        packages: list[str],
+        python_path: str,
+        verbose: bool = False,
+    ) -> tuple[int, str, str, InstallReport]:
+        if self.wheelhouse and all(x in self.prefetched for x in packages):
+            with span_label(packages_label(packages)):
+                result = await install_with_report(
+                    *("--no-index", "--find-links", str(self.wheelhouse), *packages),
+                    requested=packages,
+                    python_path=python_path,
+                    verbose=verbose,
+                )
+            if result[0] == 0:
+                return result
+        return await install_packages(
+            packages,
+            python_path=python_path,
+            verbose=verbose,
+            jobs=self.jobs,
+            wheelhouse=self.wheelhouse,
+        )
+
+    async def lock(
+        self,
+        project_dir: Path,
+        packages: list[str],
+        python_path: str,
+        key: tuple[str, ...],
+    ) -> tuple[int, str]:
+        async def resolve() -> tuple[int, str, Path]:
+            code, stderr = await lock_project(project_dir, packages, python_path)
+            return code, stderr, get_lockfile_path(project_dir)
+
+        if key not in self.locks:
+            self.locks[key] = asyncio.create_task(resolve())
+        code, stderr, lock_path = await self.locks[key]
+        target_path = get_lockfile_path(project_dir)
+        if code == 0 and lock_path != target_path:
+            shutil.copyfile(lock_path, target_path)
+        return code, stderr
+
+
+def build_spec_context(spec: ProjectSpec, index: AdapterIndex) -> ProjectContext:
+    adapters_info = []
+    for query in spec.adapters:
+        try:
+            match = index.lookup(query)
+        except AmbiguousAdapterError as e:
+            raise ValueError(f"项目 {spec.name} 中的 {e}") from e
+        if not match:
+            raise ValueError(f"项目 {spec.name} 中未找到与 {query} 相关的适配器")
+        # 批量创建时无人确认，不采用近似匹配，避免拼错时装上别的适配器
+        if not match.exact:
+            raise ValueError(
+                f"项目 {spec.name} 中的适配器 {query} 没有完全匹配，"
+                f"最接近的是 {match.adapter.name}，请写出完整名称",
+            )
+        adapters_info.append(match.adapter)
+    adapters_info = list({a.module_name: a for a in adapters_info}.values())
+
+    context = ProjectContext()
+    context.variables["project_name"] = spec.name
+    context.variables["folder_name"] = format_project_folder_name(spec.name)
+    context.variables["adapters"] = [model_dump(x) for x in adapters_info]
+    context.packages.append("nonebot2[all]")
+    for pkg in (
+        link for x in adapters_info if (link := x.project_link) not in context.packages
+    ):
+        context.packages.append(pkg)
+
+    for key, value in (
+        ("env_superusers", spec.superusers),
+        ("env_nickname", spec.nickname),
+        ("env_command_start", spec.command_start),
+        ("env_command_sep", spec.command_sep),
+    ):
+        context.variables[key] = json.dumps(value, ensure_ascii=False)
+    context.variables["env_host"] = spec.host
+    context.variables["env_port"] = str(spec.port)
+    context.variables["use_run_script"] = spec.run_script if WINDOWS else False
+    context.variables["is_windows"] = WINDOWS
+    context.variables["redirect_localstore"] = spec.redirect_localstore
+    context.variables["use_ping"] = spec.ping
+    context.variables["use_logpile"] = spec.logpile
+
+    plugins = []
+    if spec.logpile:
+        context.packages.append("nonebot-plugin-logpile")
+        plugins.append("nonebot_plugin_logpile")
+    context.variables["plugins"] = plugins
+    return context
+
+
+def check_spec_names(specs: list[ProjectSpec]):
+    seen: set[str] = set()
+    for spec in specs:
+        folder_name = format_project_folder_name(spec.name)
+        if not project_name_validator(spec.name):
+            raise ValueError(f"项目名称 {spec.name} 非法")
+        if folder_name in seen or Path(folder_name).exists():
+            raise ValueError(f"项目 {spec.name} 的文件夹 {folder_name} 已存在或重复")
+        seen.add(folder_name)
+
+
+async def provision_project(
+    spec: ProjectSpec,
+    context: ProjectContext,
+    python_path: str,
+    shared: SharedResolution,
+    venv_backend: Optional[str] = None,
+    verbose: bool = False,
+) -> ProjectResult:
+    result = ProjectResult(spec.name)
+    project_dir = Path.cwd() / context.variables["folder_name"]
+
+    with result.stage("渲染"):
+        render_project(context)
+    if not spec.venv:  # 与 -y --no-venv 相同，不装进全局环境
+        result.success = True
+        result.message = "未创建虚拟环境，依赖需要手动安装"
+        return result
+
+    golden_result: Optional[tuple[int, str, list[str]]] = None
+    if spec.golden:
+        with result.stage("克隆"):
+            golden_result = await create_venv_from_golden(
+                project_dir / ".venv",
+                project_dir.name,
+                spec.python or python_path,
+                context.packages,
+                jobs=shared.jobs,
+                wheelhouse=shared.wheelhouse,
+                venv_backend=venv_backend,
+            )
+    if golden_result is None:
+        with result.stage("虚拟环境"):
+            if not await create_venv_with_backends(
+                project_dir,
+                spec.python or python_path,
+                venv_backend,
+                quiet=True,
+            ):
+                result.message = "创建虚拟环境失败"
+                return result
+    venv_python = get_venv_python(project_dir / ".venv")
+
+    if spec.lock:
+        with result.stage("锁定"):
+            code, stderr = await shared.lock(
+                project_dir,
+                context.packages,
+                venv_python,
+                (spec.python or "", *context.packages),
+            )
+        if code != 0:
+            result.message = f"生成锁文件失败\n{stderr.rstrip()}"
+            return result
+        with result.stage("安装"):
+            code, _, stderr, _ = await sync_lockfile(
+                get_lockfile_path(project_dir),
+                python_path=venv_python,
+                verbose=verbose,
+            )
+    elif golden_result is not None:
+        code, stderr, _ = golden_result
+    else:
+        with result.stage("安装"):
+            code, _, stderr, _ = await shared.install(
+                context.packages,
+                venv_python,
+                verbose=verbose,
+            )
+    if code != 0:
+        result.message = f"依赖安装失败\n{stderr.rstrip()}"
+        return result
+
+    config_manager = ConfigManager(working_dir=project_dir, python_path=venv_python)
+    for plugin in spec.builtin_plugins:
+        config_manager.add_builtin_plugin(plugin)
+
+    result.success = True
+    return result
+
+
+def style_results(results: list[ProjectResult]) -> str:
+    name_width = max(len(x.name) for x in results)
+    lines: list[str] = []
+    for x in results:
+        status = click.style(
+            "成功" if x.success else "失败",
+            fg="green" if x.success else "red",
+            bold=True,
+        )
+        stages = " / ".join(f"{k} {v:.1f}s" for k, v in x.timings.items())
+        line = f"  {status} {x.name.ljust(name_width)}  {x.elapsed:6.1f}s"
+        if stages:
+            line += click.style(f"  ({stages})", fg="bright_black")
+        if x.message:
+            line += f"\n    {x.message.splitlines()[0]}"
+        lines.append(line)
+    success_count = sum(x.success for x in results)
+    title = click.style(
+        f"共 {len(results)} 个项目，成功 {success_count} 个，"
+        f"失败 {len(results) - success_count} 个：",
+        bold=True,
+    )
+    return "\n".join([title, *lines])
+
+
+async def batch_bootstrap(
+    spec_file: Path,
+    *,
+    verbose: bool = False,
+    venv_backend: Optional[str] = None,
+    jobs: int = 4,
+    workers: int = 4,
+    wheelhouse: Optional[Path] = None,
+    offline: bool = False,
+) -> list[ProjectResult]:
+    specs = load_spec(spec_file)
+    check_spec_names(specs)
+    interpreters_task = asyncio.create_task(discover_interpreters())
+    try:
+        index = AdapterIndex.build(
+            await load_adapters(offline) if any(x.adapters for x in specs) else [],
+        )
+        contexts = [build_spec_context(x, index) for x in specs]
+    except BaseException:
+        interpreters_task.cancel()
+        raise
+
+    python_infos = filter_venv_interpreters(await interpreters_task)
+    python_path = (
+        python_infos[0].executable if python_infos else await get_default_python()
+    )
+
+    shared = SharedResolution(jobs=jobs, wheelhouse=wheelhouse or WHEELHOUSE_DIR)
+    unlocked_packages = {
+        pkg
+        for spec, context in zip(specs, contexts, strict=True)
+        if spec.venv and (not spec.lock) and (not spec.golden)
+        for pkg in context.packages
+    }
+    if unlocked_packages:
+        click.secho(f"正在预先下载 {len(unlocked_packages)} 个共用依赖", fg="yellow")
+        await shared.prefetch(sorted(unlocked_packages), python_path)
+
+    semaphore = asyncio.Semaphore(workers)
+
+    async def run(spec: ProjectSpec, context: ProjectContext) -> ProjectResult:
+        async with semaphore:
+            click.secho(f"正在创建项目 {spec.name}", fg="yellow")
+            try:
+                result = await provision_project(
+                    spec,
+                    context,
+                    python_path,
+                    shared,
+                    venv_backend=venv_backend,
+                    verbose=verbose,
+                )
+            except Exception:
+                result = ProjectResult(spec.name, message=traceback.format_exc())
+        if result.success:
+            click.secho(f"项目 {spec.name} 创建完成", fg="green")
+        else:
+            click.secho(
+                f"项目 {spec.name} 创建失败：{result.message}",
+                fg="red",
+                err=True,
+            )
+        return result
+
+    return list(
+        await asyncio.gather(
+            *(run(s, c) for s, c in zip(specs, contexts, strict=True)),
+        ),
+    )
+
+
+async def batch_bootstrap_handler(
+    spec_file: Path,
+    *,
+    verbose: bool = False,
+    venv_backend: Optional[str] = None,
+    jobs: int = 4,
+    workers: int = 4,
+    wheelhouse: Optional[Path] = None,
+    offline: bool = False,
+    log_file: Optional[Path] = None,
+    trace_file: Optional[Path] = None,
+):
+    with spool_output(log_file), tracing(trace_file):
+        try:
+            results = await batch_bootstrap(
+                spec_file,
+                verbose=verbose,
+                venv_backend=venv_backend,
+                jobs=jobs,
+                workers=workers,
+                wheelhouse=wheelhouse,
+                offline=offline,
+            )
+        except ValueError as e:
+            click.secho(str(e), fg="red", err=True)
+            sys.exit(1)
+
+    click.echo(style_results(results))
+    if not all(x.success for x in results):
+        sys.exit(1)
@@ -1,43 +1,56 @@
+import asyncio
 import json
 import shlex
+import shutil
 import subprocess
 import sys
 import traceback
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Any, Callable, Optional
 
 import click
-import findpython
-from cookiecutter.main import cookiecutter
-from cookit.pyd import type_dump_json
-from findpython.providers import RyeProvider
+from cookit.pyd import model_dump
 from nb_cli.cli.commands.project import ProjectContext, project_name_validator
 from nb_cli.cli.utils import CLI_DEFAULT_STYLE
 from nb_cli.config.parser import ConfigManager
 from nb_cli.consts import REQUIRES_PYTHON, WINDOWS
 from nb_cli.handlers import get_default_python
-from nb_cli.handlers.adapter import list_adapters
 from nb_cli.handlers.plugin import list_builtin_plugins
-from nb_cli.handlers.venv import create_virtualenv
 from noneprompt import CheckboxPrompt, Choice, ConfirmPrompt, InputPrompt, ListPrompt
 from packaging.version import Version
-
-from ..const import INPUT_QUESTION
+from typing_extensions import TypeAlias
+
+from ..checkpoint import BootstrapState, Checkpoint
+from ..const import INPUT_QUESTION, LOCKFILE_NAME
+from ..golden import create_venv_from_golden
+from ..install import install_packages
+from ..interpreters import InterpreterInfo, find_interpreters
+from ..lockfile import get_lockfile_path, lock_project, sync_lockfile
+from ..mirrors import MirrorProbe
+from ..registry import AdapterIndex, AmbiguousAdapterError, load_adapters
+from ..render import render_bootstrap_template
+from ..report import InstallReport
+from ..spec import DEFAULT_COMMAND_SEP, DEFAULT_COMMAND_START
+from ..trace import style_slowest_labels, tracing
 from ..utils import (
-    call_pip_update_simp,
     get_uv_python_path,
+    spool_output,
     uv_exists,
     validate_ip_v_any_addr,
-    wait,
 )
-from .pip_index import pip_index_handler
+from ..venv_backends import get_venv_python, select_venv_backends
+from ..wheelhouse import WHEELHOUSE_DIR
+from .pip_index import (
+    pick_default_mirror,
+    pip_index_handler,
+    use_default_mirror,
+)
 
 if TYPE_CHECKING:
     from nb_cli.config import Adapter
 
-TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
-BOOTSTRAP_TEMPLATE_DIR = TEMPLATES_DIR / "bootstrap"
+InstallResult: TypeAlias = tuple[int, str, str, InstallReport]
 
 
 @dataclass
@@ -69,12 +82,7 @@ async def prompt_input_list(prompt: str, **kwargs) -> list[str]:
     return result
 
 
-async def prompt_bootstrap_context(
-    context: ProjectContext,
-    project_name: Optional[str] = None,
-    yes: bool = False,
-    adapters: Optional[list[str]] = None,
-):
+async def prompt_project_name(project_name: Optional[str] = None) -> str:
     def final_project_name_validator(x: str):
         return project_name_validator(x) and (
             not (Path(format_project_folder_name(x))).exists()
@@ -84,9 +92,6 @@ async def prompt_bootstrap_context(
         click.secho("项目名称非法，或项目文件夹已存在！", fg="red")
         sys.exit(1)
 
-    click.secho("加载适配器列表中……", fg="yellow", bold=True)
-    all_adapters = await list_adapters()
-
     if not project_name:
         click.secho("请输入项目名称", bold=True)
         project_name = await InputPrompt(
@@ -94,6 +99,24 @@ async def prompt_bootstrap_context(
             validator=final_project_name_validator,
             error_message="项目名称非法，或项目文件夹已存在！",
         ).prompt_async(style=CLI_DEFAULT_STYLE)
+    return project_name
+
+
+async def prompt_bootstrap_context(
+    context: ProjectContext,
+    project_name: Optional[str] = None,
+    yes: bool = False,
+    adapters: Optional[list[str]] = None,
+    all_adapters_task: Optional["asyncio.Task[list[Adapter]]"] = None,
+    on_packages_ready: Optional[Callable[[list[str]], Any]] = None,
+):
+    if not project_name:
+        project_name = await prompt_project_name()
+    if not all_adapters_task:
+        all_adapters_task = asyncio.create_task(load_adapters())
+    if not all_adapters_task.done():
+        click.secho("加载适配器列表中……", fg="yellow", bold=True)
+    all_adapters = await all_adapters_task
 
     context.variables["project_name"] = project_name
     context.variables["folder_name"] = format_project_folder_name(project_name)
@@ -103,16 +126,22 @@ async def prompt_bootstrap_context(
 
     if yes or adapters:
         adapters_info: list[Adapter] = []
+        index = AdapterIndex.build(all_adapters)
         for adapter_query in adapters or []:
-            for a in all_adapters:
-                if (adapter_query.lower() in (a.name.lower(),)) or (
-                    adapter_query in (a.module_name, a.project_link)
-                ):
-                    adapters_info.append(a)
-                    break
-            else:
+            try:
+                match = index.lookup(adapter_query)
+            except AmbiguousAdapterError as e:
+                click.secho(str(e), fg="yellow")
+                sys.exit(1)
+            if not match:
                 click.secho(f"未找到与 {adapter_query} 相关的适配器", fg="yellow")
                 sys.exit(1)
+            if not match.exact:
+                click.secho(
+                    f"{adapter_query} 已匹配到最接近的适配器 {match.adapter.name}",
+                    fg="yellow",
+                )
+            adapters_info.append(match.adapter)
         adapters_info = list(  # 根据模块名去重
             {a.module_name: a for a in adapters_info}.values(),
         )
@@ -140,11 +169,13 @@ async def prompt_bootstrap_context(
                 break
         adapters_info = [a.data for a in adapter_choices]
 
-    context.variables["adapters"] = type_dump_json(adapters_info)
+    context.variables["adapters"] = [model_dump(x) for x in adapters_info]
     for pkg in (
         link for x in adapters_info if (link := x.project_link) not in context.packages
     ):
         context.packages.append(pkg)
+    if on_packages_ready:  # 之后的问题最多只会再加几个小包
+        on_packages_ready(context.packages)
 
     env_superusers = (
         []
@@ -164,32 +195,30 @@ async def prompt_bootstrap_context(
     )
     context.variables["env_nickname"] = json.dumps(env_nickname, ensure_ascii=False)
 
-    default_command_start = ["", "/", "#"]
     env_command_start = (
         None
         if yes
         else await prompt_input_list(
             "请输入 Bot 命令起始字符，消息以起始符开头将被识别为命令，\n"
             '如果有一个指令为 查询，当该配置项中有 "/" 时使用 "/查询" 才能够触发，\n'
-            f"留空将使用默认值 {default_command_start}",
+            f"留空将使用默认值 {DEFAULT_COMMAND_START}",
         )
     )
     context.variables["env_command_start"] = json.dumps(
-        env_command_start or default_command_start,
+        env_command_start or DEFAULT_COMMAND_START,
         ensure_ascii=False,
     )
 
-    default_command_sep = [".", " "]
     env_command_sep = (
         None
         if yes
         else await prompt_input_list(
             f"请输入 Bot 命令分隔符，一般用于二级指令，"
-            f"\n留空将使用默认值 {default_command_sep}",
+            f"\n留空将使用默认值 {DEFAULT_COMMAND_SEP}",
         )
     )
     context.variables["env_command_sep"] = json.dumps(
-        env_command_sep or default_command_sep,
+        env_command_sep or DEFAULT_COMMAND_SEP,
         ensure_ascii=False,
     )
 
@@ -263,69 +292,240 @@ async def prompt_bootstrap_context(
         context.packages.append("nonebot-plugin-logpile")
         context.variables["plugins"].append("nonebot_plugin_logpile")
 
-    context.variables["plugins"] = json.dumps(context.variables["plugins"])
+
+async def discover_interpreters() -> list[InterpreterInfo]:
+    return await find_interpreters(await get_uv_python_path())
 
 
-async def create_venv(project_dir: Path, yes: bool = False) -> bool:
+def filter_venv_interpreters(infos: list[InterpreterInfo]) -> list[InterpreterInfo]:
     required_ver = Version(".".join(str(x) for x in REQUIRES_PYTHON))
-    finder = findpython.Finder()
-    uv_python_path = await get_uv_python_path()
-    if uv_python_path:
-        finder.add_provider(RyeProvider(uv_python_path), 0)
-    python_infos = [
+    return [
         x
-        for x in finder.find_all()
+        for x in infos
         if (
-            x.version >= required_ver
-            and all((p not in x.executable.parts) for p in (".venv", "venv"))
+            x.parsed_version >= required_ver  # type: ignore
+            and all((p not in Path(x.executable).parts) for p in (".venv", "venv"))
         )
     ]
-    if not python_infos:
-        selected_python = await get_default_python()
-    elif len(python_infos) == 1 or yes:
-        selected_python = python_infos[0].executable
-    else:
-        selected_python = (
-            await ListPrompt(
-                question="请选择你想要用来创建虚拟环境的 Python 解释器",
-                choices=[
-                    Choice(
-                        f"{info.implementation} {info.version} ({info.executable})",
-                        info,
-                    )
-                    for info in python_infos
-                ],
-            ).prompt_async()
-        ).data.executable
 
+
+async def create_venv_with_backends(
+    project_dir: Path,
+    python_path: str,
+    venv_backend: Optional[str] = None,
+    quiet: bool = False,
+) -> bool:
     venv_dir = project_dir / ".venv"
-    click.secho(
-        (f"正在 {venv_dir} 中使用 Python {selected_python} 创建虚拟环境"),
-        fg="yellow",
+    backends = await select_venv_backends(venv_backend)
+    for i, backend in enumerate(backends):
+        if not quiet:
+            click.secho(
+                f"正在 {venv_dir} 中使用 Python {python_path} 创建虚拟环境"
+                f"（{backend.name}）",
+                fg="yellow",
+            )
+        try:
+            await backend.create(venv_dir, python_path, project_dir.name)
+        except Exception:
+            if not quiet:
+                click.secho(
+                    f"创建虚拟环境失败\n{traceback.format_exc()}",
+                    fg="red",
+                    bold=True,
+                    err=True,
+                )
+            shutil.rmtree(venv_dir, ignore_errors=True)
+            if i == len(backends) - 1:
+                return False
+        else:
+            break
+    if not quiet:
+        click.secho("创建虚拟环境成功", fg="green", bold=True)
+    return True
+
+
+async def select_python(
+    yes: bool = False,
+    interpreters: Optional[list[InterpreterInfo]] = None,
+) -> str:
+    python_infos = filter_venv_interpreters(
+        await discover_interpreters() if interpreters is None else interpreters,
     )
-    try:
-        await create_virtualenv(
-            venv_dir,
-            prompt=project_dir.name,
-            python_path=str(selected_python),
+    if not python_infos:
+        return await get_default_python()
+    if len(python_infos) == 1 or yes:
+        return python_infos[0].executable
+    return (
+        await ListPrompt(
+            question="请选择你想要用来创建虚拟环境的 Python 解释器",
+            choices=[
+                Choice(
+                    f"{info.implementation} {info.version} ({info.executable})",
+                    info,
+                )
+                for info in python_infos
+            ],
+        ).prompt_async()
+    ).data.executable
+
+
+async def create_venv(
+    project_dir: Path,
+    yes: bool = False,
+    venv_backend: Optional[str] = None,
+    interpreters: Optional[list[InterpreterInfo]] = None,
+) -> bool:
+    return await create_venv_with_backends(
+        project_dir,
+        await select_python(yes, interpreters),
+        venv_backend,
+    )
+
+
+# 返回 None 表示没有使用缓存的环境，此时会直接创建虚拟环境
+async def create_venv_golden(
+    project_dir: Path,
+    packages: list[str],
+    yes: bool = False,
+    venv_backend: Optional[str] = None,
+    interpreters: Optional[list[InterpreterInfo]] = None,
+    jobs: int = 4,
+    wheelhouse: Optional[Path] = WHEELHOUSE_DIR,
+) -> tuple[bool, Optional[tuple[int, str, list[str]]]]:
+    python_path = await select_python(yes, interpreters)
+    click.secho("正在从缓存的环境克隆虚拟环境", fg="yellow")
+    result = await create_venv_from_golden(
+        project_dir / ".venv",
+        project_dir.name,
+        python_path,
+        packages,
+        jobs=jobs,
+        wheelhouse=wheelhouse,
+        venv_backend=venv_backend,
+    )
+    if result is not None:
+        click.secho("克隆虚拟环境成功", fg="green", bold=True)
+        return True, result
+    click.secho("无法使用缓存的环境，将直接创建虚拟环境", fg="yellow")
+    return (
+        await create_venv_with_backends(project_dir, python_path, venv_backend),
+        None,
+    )
+
+
+# 不需要用户选择解释器时，在用户回答其他问题的同时就创建好虚拟环境
+# 返回 None 表示需要之后再交互式创建，返回 False 时也会在之后重新创建并显示错误
+async def create_venv_early(
+    project_dir: Path,
+    interpreters_task: "asyncio.Task[list[InterpreterInfo]]",
+    yes: bool = False,
+    venv_backend: Optional[str] = None,
+) -> Optional[bool]:
+    python_infos = filter_venv_interpreters(await interpreters_task)
+    if len(python_infos) > 1 and (not yes):
+        return None
+    selected_python = (
+        python_infos[0].executable if python_infos else await get_default_python()
+    )
+    return await create_venv_with_backends(
+        project_dir,
+        selected_python,
+        venv_backend,
+        quiet=True,
+    )
+
+
+# 虚拟环境不能移动，所以直接装进项目目录里提前建好的虚拟环境，渲染模板时再覆盖进去
+async def install_early(
+    project_dir: Path,
+    venv_task: "asyncio.Task[Optional[bool]]",
+    packages: list[str],
+    jobs: int = 4,
+    wheelhouse: Optional[Path] = WHEELHOUSE_DIR,
+) -> Optional[InstallResult]:
+    if not await venv_task:
+        return None
+    return await install_packages(
+        packages,
+        python_path=get_venv_python(project_dir / ".venv"),
+        jobs=jobs,
+        wheelhouse=wheelhouse,
+    )
+
+
+@dataclass
+class BootstrapTasks:
+    adapters: "asyncio.Task[list[Adapter]]"
+    interpreters: "asyncio.Task[list[InterpreterInfo]]"
+    uv: "asyncio.Task[bool]"
+    venv: "Optional[asyncio.Task[Optional[bool]]]" = None
+    install: "Optional[asyncio.Task[Optional[InstallResult]]]" = None
+    mirror: "Optional[asyncio.Task[Optional[MirrorProbe]]]" = None
+    speculated: list[str] = field(default_factory=list)
+
+    @classmethod
+    def start(cls, offline: bool = False, probe: bool = False) -> "BootstrapTasks":
+        return cls(
+            adapters=asyncio.create_task(load_adapters(offline)),
+            interpreters=asyncio.create_task(discover_interpreters()),
+            uv=asyncio.create_task(uv_exists()),
+            mirror=asyncio.create_task(pick_default_mirror()) if probe else None,
         )
-    except Exception:
-        click.secho(
-            f"创建虚拟环境失败\n{traceback.format_exc()}",
-            fg="red",
-            bold=True,
-            err=True,
+
+    def start_venv(
+        self,
+        project_dir: Path,
+        yes: bool = False,
+        venv_backend: Optional[str] = None,
+    ):
+        self.venv = asyncio.create_task(
+            create_venv_early(project_dir, self.interpreters, yes, venv_backend),
+        )
+
+    def start_install(
+        self,
+        project_dir: Path,
+        packages: list[str],
+        jobs: int = 4,
+        wheelhouse: Optional[Path] = WHEELHOUSE_DIR,
+    ):
+        if not self.venv:
+            return
+        self.speculated = list(packages)
+        self.install = asyncio.create_task(
+            install_early(project_dir, self.venv, self.speculated, jobs, wheelhouse),
         )
-        return False
-    click.secho("创建虚拟环境成功", fg="green", bold=True)
-    return True
+
+    async def cancel(self):
+        tasks = [
+            x
+            for x in (
+                self.adapters,
+                self.interpreters,
+                self.uv,
+                self.venv,
+                self.install,
+                self.mirror,
+            )
+            if x
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 
 async def post_project_render(
     context: ProjectContext,
+    checkpoint: Checkpoint,
     yes: bool = False,
     verbose: bool = False,
     venv: Optional[bool] = None,
+    venv_backend: Optional[str] = None,
+    jobs: int = 4,
+    wheelhouse: Optional[Path] = WHEELHOUSE_DIR,
+    lock: bool = False,
+    golden: bool = False,
+    tasks: Optional[BootstrapTasks] = None,
 ) -> bool:
     use_venv = (
         (
@@ -338,13 +538,41 @@ async def post_project_render(
         if venv is None
         else venv
     )
-    project_dir_name = context.variables["project_name"].replace(" ", "-").lower()
-    project_dir = Path.cwd() / project_dir_name
-    if use_venv and (not await create_venv(project_dir, yes)):
-        return False
+    checkpoint.state.use_venv = use_venv
+    checkpoint.save()
+    project_dir = checkpoint.project_dir
+    venv_dir = project_dir / ".venv"
+    golden_result: Optional[tuple[int, str, list[str]]] = None
+    if not use_venv:
+        pass
+    elif checkpoint.done("venv") and (venv_dir / "pyvenv.cfg").is_file():
+        click.secho("虚拟环境已创建，跳过", fg="green")
+    elif tasks and tasks.venv and (await tasks.venv):
+        click.secho("虚拟环境已在后台创建完成", fg="green", bold=True)
+    else:
+        if checkpoint.resumed:  # 上次可能只创建到一半
+            shutil.rmtree(venv_dir, ignore_errors=True)
+        interpreters = (await tasks.interpreters) if tasks else None
+        if golden:
+            ok, golden_result = await create_venv_golden(
+                project_dir,
+                context.packages,
+                yes,
+                venv_backend,
+                interpreters=interpreters,
+                jobs=jobs,
+                wheelhouse=wheelhouse,
+            )
+        else:
+            ok = await create_venv(project_dir, yes, venv_backend, interpreters)
+        if not ok:
+            return False
+    if use_venv:
+        checkpoint.mark("venv")
 
     if (
         (not yes)
+        and (not checkpoint.resumed)
         and (not await uv_exists())
         and await ConfirmPrompt(
             "是否需要修改或清除 pip 的 PyPI 镜像源配置？",
@@ -352,42 +580,94 @@ async def post_project_render(
         ).prompt_async(style=CLI_DEFAULT_STYLE)
     ):
         await pip_index_handler(verbose=verbose)
+    elif tasks and tasks.mirror and (mirror := await tasks.mirror):
+        await use_default_mirror(mirror)
+
+    config_manager = ConfigManager(working_dir=project_dir, use_venv=use_venv)
+    if lock and checkpoint.done("lock") and get_lockfile_path(project_dir).is_file():
+        click.secho(f"已有锁文件 {LOCKFILE_NAME}，跳过解析", fg="green")
+    elif lock:
+        click.secho("正在解析项目依赖并生成锁文件", fg="yellow")
+        code, stderr = await lock_project(
+            project_dir,
+            context.packages,
+            python_path=config_manager.python_path,
+        )
+        if code == 0:
+            click.secho(f"已生成锁文件 {LOCKFILE_NAME}", fg="green")
+            checkpoint.mark("lock")
+        else:
+            click.secho(
+                f"生成锁文件失败，将直接安装依赖\n{stderr.rstrip()}",
+                fg="red",
+                err=True,
+            )
+            lock = False
 
     manually_install_tip = (
         "项目依赖已写入项目 pyproject.toml 中，"
         "请自行手动安装，或使用 pdm 等包管理器安装"
     )
-    if (
-        (not use_venv)
-        if yes
-        else not await ConfirmPrompt(
-            (
-                f"是否立即安装项目依赖？"
-                f"{'' if use_venv else '（注意：将会安装到默认全局环境中！）'}"
-            ),
-            default_choice=True,
-        ).prompt_async(style=CLI_DEFAULT_STYLE)
+    if checkpoint.done("install"):
+        click.secho("项目依赖已安装，跳过", fg="green")
+    elif (
+        (not (tasks and tasks.install))
+        and (golden_result is None)
+        and (
+            (not use_venv)
+            if yes
+            else not await ConfirmPrompt(
+                (
+                    f"是否立即安装项目依赖？"
+                    f"{'' if use_venv else '（注意：将会安装到默认全局环境中！）'}"
+                ),
+                default_choice=True,
+            ).prompt_async(style=CLI_DEFAULT_STYLE)
+        )
     ):
         click.secho(manually_install_tip, fg="green")
+        checkpoint.clear()
         return True
-
-    click.secho("正在安装项目依赖", fg="yellow")
-    config_manager = ConfigManager(working_dir=project_dir, use_venv=use_venv)
-    proc = await call_pip_update_simp(
-        *context.packages,
-        python_path=config_manager.python_path,
-    )
-    code, _, stderr = await wait(proc, verbose=verbose)
-    if code == 0:
-        click.secho("依赖安装成功", fg="green", bold=True)
     else:
-        click.secho(
-            f"依赖安装失败，{manually_install_tip}\n{stderr}",
-            fg="red",
-            bold=True,
-            err=True,
-        )
-        return False
+        click.secho("正在安装项目依赖", fg="yellow")
+        if lock:
+            code, _, stderr, _ = await sync_lockfile(
+                get_lockfile_path(project_dir),
+                python_path=config_manager.python_path,
+                verbose=verbose,
+            )
+        elif golden_result is not None:  # 克隆后已经补装了缺少的包
+            code, stderr, _ = golden_result
+        else:
+            packages = context.packages
+            if tasks and tasks.install:
+                result = await tasks.install
+                if result and result[0] == 0:  # 只补装后面的问题中新加的包
+                    packages = [x for x in packages if x not in tasks.speculated]
+            code, _, stderr, _ = (
+                await install_packages(
+                    packages,
+                    python_path=config_manager.python_path,
+                    verbose=verbose,
+                    jobs=jobs,
+                    wheelhouse=wheelhouse,
+                )
+                if packages
+                else (0, "", "", InstallReport())
+            )
+        if code == 0:
+            click.secho("依赖安装成功", fg="green", bold=True)
+            if slowest := style_slowest_labels():
+                click.echo(slowest)
+        else:
+            click.secho(
+                f"依赖安装失败，{manually_install_tip}\n{stderr}",
+                fg="red",
+                bold=True,
+                err=True,
+            )
+            return False
+        checkpoint.mark("install")
 
     if not yes:
         builtin_plugins = await list_builtin_plugins(
@@ -412,25 +692,11 @@ async def post_project_render(
             )
             return False
 
+    checkpoint.clear()  # 全部完成后不再需要继续
     return True
 
 
-async def bootstrap_handler(
-    *,
-    project_name: Optional[str] = None,
-    yes: bool = False,
-    verbose: bool = False,
-    venv: Optional[bool] = None,
-    adapters: Optional[list[str]] = None,
-):
-    context = ProjectContext()
-    await prompt_bootstrap_context(
-        context,
-        yes=yes,
-        project_name=project_name,
-        adapters=adapters,
-    )
-
+def render_project(context: ProjectContext, overwrite_if_exists: bool = False):
     context.variables["nb_python_path"] = sys.executable
     nb_command_list = [sys.executable, "-m", "nb_cli"]
     context.variables["nb_command"] = (
@@ -438,19 +704,64 @@ async def bootstrap_handler(
         if WINDOWS
         else " ".join(shlex.quote(x) for x in nb_command_list)
     )
-    extra_context = {
-        "nonebot": {
-            **context.variables,
-            "packages": json.dumps(context.packages),
-        },
-    }
+    render_bootstrap_template(
+        context.variables,
+        context.packages,
+        Path.cwd(),
+        overwrite_if_exists=overwrite_if_exists,
+    )
+
+
+async def bootstrap_project(
+    tasks: BootstrapTasks,
+    *,
+    project_name: Optional[str] = None,
+    yes: bool = False,
+    verbose: bool = False,
+    venv: Optional[bool] = None,
+    venv_backend: Optional[str] = None,
+    adapters: Optional[list[str]] = None,
+    jobs: int = 4,
+    wheelhouse: Optional[Path] = None,
+    lock: bool = False,
+    speculative: bool = False,
+    golden: bool = False,
+) -> Optional[bool]:
+    project_name = await prompt_project_name(project_name)
+    project_dir = Path.cwd() / format_project_folder_name(project_name)
+    if (not golden) and (venv if venv is not None else yes):
+        tasks.start_venv(project_dir, yes, venv_backend)
+
+    context = ProjectContext()
     try:
-        cookiecutter(
-            str(BOOTSTRAP_TEMPLATE_DIR.resolve()),
-            no_input=True,
-            extra_context=extra_context,
-            output_dir=".",
+        await prompt_bootstrap_context(
+            context,
+            yes=yes,
+            project_name=project_name,
+            adapters=adapters,
+            all_adapters_task=tasks.adapters,
+            on_packages_ready=(
+                (
+                    lambda packages: tasks.start_install(
+                        project_dir,
+                        packages,
+                        jobs=jobs,
+                        wheelhouse=wheelhouse or WHEELHOUSE_DIR,
+                    )
+                )
+                if speculative and (not lock)
+                else None
+            ),
         )
+    except BaseException:  # 包括中途退出
+        if tasks.venv:
+            await tasks.cancel()
+            shutil.rmtree(project_dir, ignore_errors=True)
+        raise
+
+    try:
+        # 虚拟环境可能已经建好了
+        render_project(context, overwrite_if_exists=bool(tasks.venv))
     except Exception:
         click.secho(
             f"新建项目失败！\n{traceback.format_exc()}",
@@ -458,19 +769,141 @@ async def bootstrap_handler(
             bold=True,
             err=True,
         )
-        return
+        if tasks.venv:
+            await tasks.cancel()
+            shutil.rmtree(project_dir, ignore_errors=True)
+        return None
     click.secho(
         f"成功新建项目 {context.variables['project_name']}",
         fg="green",
         bold=True,
     )
+    checkpoint = Checkpoint(
+        project_dir,
+        BootstrapState(
+            variables=context.variables,
+            packages=context.packages,
+            venv_backend=venv_backend,
+            lock=lock,
+            golden=golden,
+        ),
+    )
+    checkpoint.mark("render")
+
+    return await post_project_render(
+        context,
+        checkpoint,
+        yes=yes,
+        verbose=verbose,
+        venv=venv,
+        venv_backend=venv_backend,
+        jobs=jobs,
+        wheelhouse=wheelhouse or WHEELHOUSE_DIR,
+        lock=lock,
+        golden=golden,
+        tasks=tasks,
+    )
+
 
-    if await post_project_render(context, yes=yes, verbose=verbose, venv=venv):
+async def resume_project(
+    project_dir: Path,
+    *,
+    yes: bool = False,
+    verbose: bool = False,
+    jobs: int = 4,
+    wheelhouse: Optional[Path] = None,
+) -> Optional[bool]:
+    checkpoint = Checkpoint.load(project_dir.resolve())
+    if not checkpoint:
+        click.secho(f"{project_dir} 中没有可以继续的创建记录", fg="red", err=True)
+        return None
+    state = checkpoint.state
+    click.secho(
+        f"继续配置项目 {state.variables.get('project_name', project_dir.name)}",
+        fg="yellow",
+        bold=True,
+    )
+    return await post_project_render(
+        ProjectContext(variables=state.variables, packages=state.packages),
+        checkpoint,
+        yes=yes,
+        verbose=verbose,
+        venv=state.use_venv,
+        venv_backend=state.venv_backend,
+        jobs=jobs,
+        wheelhouse=wheelhouse or WHEELHOUSE_DIR,
+        lock=state.lock,
+        golden=state.golden,
+    )
+
+
+def report_bootstrap_result(success: bool):
+    if success:
         click.secho("项目配置完毕，开始使用吧！", fg="green", bold=True)
     else:
         click.secho(
-            "项目配置失败！你可能需要考虑手动进行后续配置，或重新创建一次项目",
+            (
+                "项目配置失败！你可能需要考虑手动进行后续配置，"
+                "或在解决问题后使用 nb bootstrap --resume 项目文件夹 从失败处继续"
+            ),
             fg="red",
             bold=True,
             err=True,
         )
+
+
+async def bootstrap_handler(
+    *,
+    project_name: Optional[str] = None,
+    yes: bool = False,
+    verbose: bool = False,
+    venv: Optional[bool] = None,
+    venv_backend: Optional[str] = None,
+    adapters: Optional[list[str]] = None,
+    jobs: int = 4,
+    wheelhouse: Optional[Path] = None,
+    lock: bool = False,
+    speculative: bool = False,
+    golden: bool = False,
+    offline: bool = False,
+    resume: Optional[Path] = None,
+    log_file: Optional[Path] = None,
+    trace_file: Optional[Path] = None,
+):
+    if resume:
+        with spool_output(log_file), tracing(trace_file):
+            success = await resume_project(
+                resume,
+                yes=yes,
+                verbose=verbose,
+                jobs=jobs,
+                wheelhouse=wheelhouse,
+            )
+        if success is None:
+            sys.exit(1)
+        report_bootstrap_result(success)
+        return
+
+    with spool_output(log_file), tracing(trace_file):
+        # -y 时不会询问镜像源，在后台测速选出默认的源
+        tasks = BootstrapTasks.start(offline, probe=yes and (not offline))
+        try:
+            success = await bootstrap_project(
+                tasks,
+                project_name=project_name,
+                yes=yes,
+                verbose=verbose,
+                venv=venv,
+                venv_backend=venv_backend,
+                adapters=adapters,
+                jobs=jobs,
+                wheelhouse=wheelhouse,
+                lock=lock,
+                speculative=speculative,
+                golden=golden,
+            )
+        finally:
+            await tasks.cancel()
+    if success is None:
+        return
+    report_bootstrap_result(success)
@@ -1,10 +1,20 @@
+import os
 import sys
+from typing import Any, Optional
 
 import click
 from nb_cli.cli.utils import CLI_DEFAULT_STYLE
-from noneprompt import Choice, InputPrompt, ListPrompt
+from noneprompt import CheckboxPrompt, Choice, ConfirmPrompt, InputPrompt, ListPrompt
 
 from ..const import INPUT_QUESTION
+from ..index import DEFAULT_INDEX_URL, get_index_url
+from ..mirrors import (
+    MIRROR_CHAIN_PATH,
+    MirrorProbe,
+    load_mirror_chain,
+    probe_mirrors,
+    save_mirror_chain,
+)
 from ..utils import call_pip_simp, uv_exists, validate_http_url, wait
 
 PyPIMirrorCustom = type("PyPIMirrorCustom", (), {})
@@ -18,27 +28,159 @@ PYPI_MIRRORS = (
 )
 
 
-async def pip_index_handler(verbose: bool = False):
+# 不使用镜像源时按官方源测速
+async def probe_pypi_mirrors() -> list[MirrorProbe]:
+    return await probe_mirrors(
+        [
+            (name, url if isinstance(url, str) else DEFAULT_INDEX_URL)
+            for name, url in PYPI_MIRRORS
+            if not isinstance(url, PyPIMirrorCustom)
+        ],
+    )
+
+
+def style_probes(probes: list[MirrorProbe]) -> str:
+    lines = [click.style("镜像源测速结果：", bold=True)]
+    for i, x in enumerate(probes, 1):
+        if x.reachable:
+            lines.append(f"  {i}. {x.name} > {x.url}  {x.describe()}")
+        else:
+            lines.append(
+                click.style(f"  -  {x.name} > {x.url}  {x.describe()}", fg="red"),
+            )
+    return "\n".join(lines)
+
+
+def get_mirror_choices(
+    probes: Optional[list[MirrorProbe]] = None,
+) -> list[Choice[Any]]:
+    if probes is None:
+        return [
+            Choice(f"{name} > {url}" if isinstance(url, str) else name, url)
+            for name, url in PYPI_MIRRORS
+        ]
+    choices: list[Choice[Any]] = [
+        Choice(
+            f"{x.name} > {x.url}（{x.describe()}）",
+            None if x.url == DEFAULT_INDEX_URL else x.url,
+        )
+        for x in probes
+        if x.reachable
+    ]
+    choices.extend(
+        Choice(name, url)
+        for name, url in PYPI_MIRRORS
+        if isinstance(url, PyPIMirrorCustom)
+    )
+    return choices
+
+
+async def prompt_custom_mirror() -> str:
+    while True:
+        click.secho("请输入 PyPI 源地址", bold=True)
+        url = await InputPrompt(
+            INPUT_QUESTION,
+            validator=validate_http_url,
+            error_message="链接格式不正确！",
+        ).prompt_async(style=CLI_DEFAULT_STYLE)
+
+        click.secho("正在测试该镜像源", fg="yellow")
+        probe, *_ = await probe_mirrors([("自定义", url)])
+        if probe.reachable:
+            click.secho(f"测试通过：{probe.describe()}", fg="green")
+            return url
+        click.secho(f"该镜像源{probe.describe()}", fg="red")
+        if await ConfirmPrompt(
+            "仍然要使用该镜像源吗？",
+            default_choice=False,
+        ).prompt_async(style=CLI_DEFAULT_STYLE):
+            return url
+
+
+# -y 创建项目且没有配置过源时，选出最快的源只在本次安装中使用
+async def pick_default_mirror() -> Optional[MirrorProbe]:
+    if await get_index_url() != DEFAULT_INDEX_URL:
+        return None
+    probes = [x for x in await probe_pypi_mirrors() if x.reachable]
+    if (not probes) or probes[0].url == DEFAULT_INDEX_URL:
+        return None
+    return probes[0]
+
+
+async def use_default_mirror(probe: MirrorProbe):
+    os.environ["PIP_INDEX_URL"] = probe.url
+    if await uv_exists():
+        os.environ["UV_INDEX_URL"] = probe.url
+    click.secho(
+        f"本次安装将使用最快的镜像源 {probe.name} > {probe.url}（{probe.describe()}）",
+        fg="green",
+    )
+
+
+# 安装时网络出错会按顺序换用这些源重试，pip 与 uv 都适用
+async def mirror_chain_handler():
+    if current := load_mirror_chain():
+        click.echo(
+            click.style("当前的备用镜像源：\n", bold=True)
+            + "\n".join(f"  {i}. {x}" for i, x in enumerate(current, 1)),
+        )
+
+    click.secho("正在测试各镜像源的速度", fg="yellow")
+    probes = await probe_pypi_mirrors()
+    click.echo(style_probes(probes))
+    reachable = [x for x in probes if x.reachable]
+    if not reachable:
+        click.secho("所有镜像源均无法访问，备用镜像源配置未变", fg="yellow", bold=True)
+        return
+
+    selected = await CheckboxPrompt(
+        "请选择安装失败时依次换用的 PyPI 镜像源（已按速度排序）",
+        [Choice(f"{x.name} > {x.url}（{x.describe()}）", x.url) for x in reachable],
+        default_select=list(range(len(reachable))),
+    ).prompt_async(style=CLI_DEFAULT_STYLE)
+    urls = [x.data for x in selected]
+    try:
+        save_mirror_chain(urls)
+    except OSError as e:
+        click.secho(f"备用镜像源配置失败！\n{e}", fg="red", bold=True, err=True)
+        return
+    if urls:
+        click.secho(
+            f"备用镜像源配置成功，已保存到 {MIRROR_CHAIN_PATH}",
+            fg="green",
+            bold=True,
+        )
+    else:
+        click.secho("已清除备用镜像源", fg="green", bold=True)
+
+
+async def pip_index_handler(
+    verbose: bool = False,
+    probe: bool = False,
+    chain: bool = False,
+):
+    if chain:
+        await mirror_chain_handler()
+        return
+
     if await uv_exists():
         click.secho("此功能暂不适用于 uv", fg="yellow")
         sys.exit(1)
 
+    probes: Optional[list[MirrorProbe]] = None
+    if probe:
+        click.secho("正在测试各镜像源的速度", fg="yellow")
+        probes = await probe_pypi_mirrors()
+        click.echo(style_probes(probes))
+
     choice = await ListPrompt(
         "请选择你想要对 pip 使用的 PyPI 镜像源",
-        [
-            Choice(f"{name} > {url}" if isinstance(url, str) else name, url)
-            for name, url in PYPI_MIRRORS
-        ],
+        get_mirror_choices(probes),
     ).prompt_async(style=CLI_DEFAULT_STYLE)
 
     selected = choice.data
     if isinstance(selected, PyPIMirrorCustom):
-        click.secho("请输入 PyPI 源地址", bold=True)
-        selected_mirror = await InputPrompt(
-            INPUT_QUESTION,
-            validator=validate_http_url,
-            error_message="链接格式不正确！",
-        ).prompt_async(style=CLI_DEFAULT_STYLE)
+        selected_mirror = await prompt_custom_mirror()
     else:
         selected_mirror = selected
 
@@ -1,3 +1,8 @@
+import asyncio
+import shutil
+import sys
+import unicodedata
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Optional
 
 import click
@@ -5,25 +10,59 @@ from nb_cli.cli.utils import CLI_DEFAULT_STYLE
 from nb_cli.handlers.meta import (
     get_default_python,
     get_nonebot_config,
+    get_project_root,
     requires_pip,
     requires_project_root,
 )
 from noneprompt import ConfirmPrompt
 
+from ..conflict import Conflict, ConflictBisector
+from ..const import LOCKFILE_NAME
+from ..history import (
+    create_snapshot,
+    list_snapshot_ids,
+    load_snapshot,
+    rollback_snapshot,
+    save_snapshot,
+)
+from ..index import VersionCheck, check_versions
+from ..install import install_with_report, update_package, update_packages
+from ..lockfile import (
+    get_lockfile_path,
+    lock_project,
+    merge_requirements,
+    read_project_dependencies,
+    sync_lockfile,
+)
+from ..metadata import build_module_index, find_module_distribution
+from ..report import InstallReport, format_size
+from ..trace import span_label, style_slowest_labels, tracing
 from ..utils import (
     FailInstallInfo,
     InstallInfoType,
     SuccessInstallInfo,
+    is_network_error_output,
     list_all_packages,
     normalize_pkg_name,
-    update_package,
+    spool_output,
+    use_uv,
 )
+from ..verify import ImportResult, verify_imports
+from ..wheelhouse import WHEELHOUSE_DIR, fill_wheelhouse
 
 if TYPE_CHECKING:
     from pathlib import Path
 
 ADAPTER_PKG_PFX = "nonebot.adapters."
 LEN_ADAPTER_PKG_PFX = len(ADAPTER_PKG_PFX)
+DOWNLOAD_ATTEMPTS = 2
+
+
+@dataclass
+class UpdatePlan:
+    batch: list[str] = field(default_factory=list)
+    fallback: list[str] = field(default_factory=list)
+    conflicts: list[Conflict] = field(default_factory=list)
 
 
 def guess_adapter_pkg_name(module_names: list[str]) -> list[str]:
@@ -36,6 +75,27 @@ def guess_adapter_pkg_name(module_names: list[str]) -> list[str]:
     return [normalize_pkg_name(x) for x in pkg_names]
 
 
+# 先按已安装的元数据找到模块实际所属的包，只有没装上的模块才按命名规则猜测
+async def get_project_packages(
+    adapters: list[str],
+    plugins: list[str],
+    python_path: str,
+) -> list[str]:
+    try:
+        index = await build_module_index(python_path)
+    except Exception:
+        index = {}
+    pkgs = [
+        *(
+            find_module_distribution(index, x) or guess_adapter_pkg_name([x])[0]
+            for x in adapters
+        ),
+        *(find_module_distribution(index, x) or x for x in plugins),
+    ]
+    # 同一个包可能提供多个适配器，如 OneBot V11 与 V12
+    return list(dict.fromkeys(normalize_pkg_name(x) for x in pkgs))
+
+
 def style_change(*change: Optional[str]) -> str:
     return " -> ".join(
         click.style(x, fg="cyan")
@@ -54,6 +114,61 @@ def style_change_dict(change: dict[str, tuple[Optional[str], Optional[str]]]) ->
     )
 
 
+def style_version_checks(checks: list[VersionCheck]) -> str:
+    up_to_date = [x for x in checks if x.latest and not x.outdated]
+    outdated = {x.name: (x.installed, x.latest) for x in checks if x.outdated}
+    unknown = [x for x in checks if not x.latest]
+
+    info_li: list[str] = []
+    if up_to_date:
+        up_to_date_title = click.style(
+            f"已是最新版本（{len(up_to_date)} 个）：",
+            fg="green",
+            bold=True,
+        )
+        width = max(len(x.name) for x in up_to_date)
+        up_to_date_pkgs = "\n".join(
+            f"  {x.name.ljust(width)} {click.style(x.installed or '', fg='cyan')}"
+            for x in up_to_date
+        )
+        info_li.append(f"{up_to_date_title}\n{up_to_date_pkgs}")
+
+    if outdated:
+        outdated_title = click.style(
+            f"可更新（{len(outdated)} 个）：",
+            fg="yellow",
+            bold=True,
+        )
+        info_li.append(f"{outdated_title}\n{style_change_dict(outdated)}")
+
+    if unknown:
+        info_li.append(style_unknown_checks(unknown))
+
+    return "\n\n".join(info_li)
+
+
+def style_unknown_checks(unknown: list[VersionCheck]) -> str:
+    unknown_title = click.style(
+        f"无法获取最新版本（{len(unknown)} 个）：",
+        fg="red",
+        bold=True,
+    )
+    width = max(len(x.name) for x in unknown)
+    unknown_pkgs = "\n".join(
+        f"  {x.name.ljust(width)} {click.style(x.installed or '未安装', fg='cyan')}"
+        for x in unknown
+    )
+    return f"{unknown_title}\n{unknown_pkgs}"
+
+
+def collect_reports(infos: list[InstallInfoType]) -> list[InstallReport]:
+    return list(
+        {
+            id(x.report): x.report for x in infos if isinstance(x, SuccessInstallInfo)
+        }.values(),
+    )
+
+
 async def summary_infos(
     infos: list[InstallInfoType],
     pkgs_before_install: dict[str, str],
@@ -79,6 +194,16 @@ async def summary_infos(
     changed_others = {k: v for k, v in changed_pkgs.items() if k not in changed_targets}
 
     info_li: list[str] = []
+    if reports := [x for x in collect_reports(infos) if x.fetch_known]:
+        download_size = sum(x.download_size for x in reports)
+        cached_count = sum(x.cached_count for x in reports)
+        info_li.append(
+            click.style(
+                f"共下载 {format_size(download_size)}，{cached_count} 个包使用了缓存",
+                fg="bright_black",
+            ),
+        )
+
     if unchanged_infos:
         unchanged_title = click.style(
             f"版本未变（{len(unchanged_infos)} 个）：",
@@ -120,59 +245,463 @@ async def summary_infos(
     return "\n\n".join(info_li)
 
 
-# 不能一下子全传进去，否则可能导致依赖冲突
+# 先将所有包放在一起解析，失败时二分找出最小失败集合，只有这些包才逐个更新
+async def plan_update(
+    packages: list[str],
+    python_path: str,
+    jobs: int = 4,
+    bisector: Optional[ConflictBisector] = None,
+) -> UpdatePlan:
+    if bisector is None:
+        bisector = ConflictBisector(python_path, jobs=jobs)
+    ok, stderr = await bisector.check(packages)
+    # 包名错误等问题也能二分找出来，只有网络问题二分也没用
+    if (not ok) and is_network_error_output(stderr):
+        return UpdatePlan(fallback=packages.copy())
+
+    result = await bisector.bisect(packages)
+    conflicted = {x for c in result.conflicts for x in c.packages}
+    return UpdatePlan(
+        batch=result.resolved,
+        fallback=[x for x in packages if x in conflicted],
+        conflicts=result.conflicts,
+    )
+
+
+def style_conflicts(conflicts: list[Conflict]) -> str:
+    return "\n".join(
+        f"  {', '.join(c.packages)}"
+        + (f": {click.style(c.detail, fg='red')}" if c.detail else "")
+        for c in conflicts
+    )
+
+
+def fit_terminal_width(text: str) -> str:
+    width = shutil.get_terminal_size().columns - 1
+    used = 0
+    for i, char in enumerate(text):
+        used += 2 if unicodedata.east_asian_width(char) in "WF" else 1
+        if used > width:
+            return f"{text[: max(i - 1, 0)]}…"
+    return text
+
+
+# 解析与下载可以同时进行，只有写入环境的安装步骤需要排队
+class UpdateExecutor:
+    def __init__(
+        self,
+        python_path: str,
+        verbose: bool = False,
+        jobs: int = 4,
+        wheelhouse: Optional["Path"] = WHEELHOUSE_DIR,
+        bisector: Optional[ConflictBisector] = None,
+    ):
+        self.python_path = python_path
+        self.verbose = verbose
+        self.wheelhouse = wheelhouse
+        self.bisector = bisector or ConflictBisector(python_path, jobs=jobs)
+        self.phases: dict[str, str] = {}
+        self.finished = 0
+        self.total = 0
+        # 详细输出时安装器的输出会打乱状态行
+        self.live = sys.stdout.isatty() and (not verbose)
+        self._semaphore = asyncio.Semaphore(jobs)
+        self._install_lock = asyncio.Lock()
+        # 下载 wheel 时的输出，离线安装后合并到各个包的报告中
+        self._fetched = InstallReport()
+
+    def render(self):
+        if not self.live:
+            return
+        groups: dict[str, list[str]] = {}
+        for pkg, phase in self.phases.items():
+            groups.setdefault(phase, []).append(pkg)
+        status = " | ".join(f"{k} {', '.join(v)}" for k, v in groups.items())
+        line = fit_terminal_width(f"更新中 [{self.finished}/{self.total}] {status}")
+        click.echo(f"\r\x1b[K{line}", nl=False)
+
+    def clear(self):
+        if self.live:
+            click.echo("\r\x1b[K", nl=False)
+
+    def set_phase(self, pkg: str, phase: Optional[str]):
+        if phase:
+            self.phases[pkg] = phase
+        else:
+            self.phases.pop(pkg, None)
+            self.finished += 1
+        self.render()
+
+    async def prepare(self, pkg: str) -> tuple[Optional[FailInstallInfo], bool]:
+        async with self._semaphore:
+            self.set_phase(pkg, "解析")
+            ok, stderr = await self.bisector.check([pkg])
+            if not ok:
+                return FailInstallInfo(pkg, "", stderr), False
+            if (not self.wheelhouse) or await use_uv():  # uv 安装时自己会并发下载
+                return None, False
+            self.set_phase(pkg, "下载")
+            # 下载失败在这里重试，不要拖到排队的安装步骤里
+            for _ in range(DOWNLOAD_ATTEMPTS):
+                if not await fill_wheelhouse(
+                    [pkg],
+                    self.wheelhouse,
+                    self.python_path,
+                    jobs=1,
+                    report=self._fetched,
+                ):
+                    return None, True
+            return None, False
+
+    async def install(self, pkg: str, downloaded: bool) -> InstallInfoType:
+        if downloaded and self.wheelhouse:
+            with span_label(pkg):
+                code, stdout, stderr, report = await install_with_report(
+                    *("--no-index", "--find-links", str(self.wheelhouse), pkg),
+                    requested=[pkg],
+                    python_path=self.python_path,
+                    verbose=self.verbose,
+                )
+            if code == 0:
+                report.merge_fetched(self._fetched.fetched)
+                return SuccessInstallInfo(pkg, stdout, stderr, report)
+        # 离线安装失败时直接在线安装，不再下载到 wheelhouse
+        return await update_package(
+            pkg,
+            self.python_path,
+            verbose=self.verbose,
+            wheelhouse=None,
+        )
+
+    async def run(self, pkg: str) -> InstallInfoType:
+        info, downloaded = await self.prepare(pkg)
+        if not info:
+            self.set_phase(pkg, "等待安装")
+            async with self._install_lock:
+                self.set_phase(pkg, "安装")
+                info = await self.install(pkg, downloaded)
+        self.set_phase(pkg, None)
+        if isinstance(info, FailInstallInfo):
+            self.clear()
+            click.secho(
+                f"更新 {pkg} 失败！可能原因：{info.reason}\n{info.stderr.rstrip()}",
+                fg="red",
+                err=True,
+            )
+            self.render()
+        return info
+
+    async def update(self, packages: list[str]) -> list[InstallInfoType]:
+        self.total += len(packages)
+        self.render()
+        try:
+            return list(await asyncio.gather(*(self.run(x) for x in packages)))
+        finally:
+            self.clear()
+
+
+async def update_one_by_one(
+    packages: list[str],
+    python_path: str,
+    verbose: bool = False,
+    jobs: int = 4,
+    wheelhouse: Optional["Path"] = WHEELHOUSE_DIR,
+    bisector: Optional[ConflictBisector] = None,
+) -> list[InstallInfoType]:
+    executor = UpdateExecutor(
+        python_path,
+        verbose=verbose,
+        jobs=jobs,
+        wheelhouse=wheelhouse,
+        bisector=bisector,
+    )
+    return await executor.update(packages)
+
+
 async def update(
     packages: list[str],
     python_path: str,
     verbose: bool = False,
+    jobs: int = 4,
+    wheelhouse: Optional["Path"] = WHEELHOUSE_DIR,
+    project_root: Optional["Path"] = None,
 ) -> list[InstallInfoType]:
     pkg_list_before = await list_all_packages(python_path)
-    infos = []
-    with click.progressbar(
-        packages,
-        show_eta=False,
-        show_percent=True,
-        show_pos=True,
-        item_show_func=lambda x: (click.style(x, fg="green", bold=True) if x else None),
-        bar_template=f"更新中 {click.style('%(info)s', fg='cyan')} [%(bar)s]",
-    ) as pkgs_prog:
-        for pkg in pkgs_prog:
-            info = await update_package(pkg, python_path, verbose=verbose)
-            infos.append(info)
-            if isinstance(info, FailInstallInfo):
-                click.secho(
-                    f"\n更新 {pkg} 失败！可能原因：{info.reason}\n{info.stderr.rstrip()}",
-                    fg="red",
-                    err=True,
-                )
+
+    click.secho("解析依赖中", fg="yellow")
+    # 逐个更新时复用单个包的解析结果
+    bisector = ConflictBisector(python_path, jobs=jobs)
+    plan = await plan_update(packages, python_path, jobs=jobs, bisector=bisector)
+
+    infos: list[InstallInfoType] = []
+    if plan.batch:
+        click.secho(f"一次性更新 {len(plan.batch)} 个包中", fg="yellow")
+        batch_infos = await update_packages(
+            plan.batch,
+            python_path,
+            verbose=verbose,
+            jobs=jobs,
+            wheelhouse=wheelhouse,
+        )
+        if all(isinstance(x, SuccessInstallInfo) for x in batch_infos):
+            infos.extend(batch_infos)
+        else:  # 解析通过但安装失败，交给逐个更新处理
+            plan.fallback = [x for x in packages if x in (*plan.batch, *plan.fallback)]
+
+    if plan.fallback:
+        if plan.conflicts:
+            conflict_title = click.style(
+                f"检测到 {len(plan.conflicts)} 组无法一同更新的包，将逐个更新：",
+                fg="yellow",
+            )
+            click.echo(f"{conflict_title}\n{style_conflicts(plan.conflicts)}")
+        infos.extend(
+            await update_one_by_one(
+                plan.fallback,
+                python_path,
+                verbose=verbose,
+                jobs=jobs,
+                wheelhouse=wheelhouse,
+                bisector=bisector,
+            ),
+        )
 
     click.secho("统计数据中\n", fg="yellow")
     pkg_list_after = await list_all_packages(python_path)
     click.echo(await summary_infos(infos, pkg_list_before, pkg_list_after))
+    if slowest := style_slowest_labels():
+        click.echo(f"\n{slowest}")
+
+    if project_root and pkg_list_before != pkg_list_after:
+        snapshot = create_snapshot(
+            packages,
+            [x.name for x in infos if isinstance(x, FailInstallInfo)],
+            pkg_list_before,
+            pkg_list_after,
+            collect_reports(infos),
+        )
+        save_snapshot(project_root, snapshot)
+        click.secho(
+            f"\n已保存本次更新的快照 {snapshot.id}，"
+            f"如需回滚请执行 nb update-project --rollback {snapshot.id}",
+            fg="bright_black",
+        )
     return infos
 
 
+def style_import_results(results: list[ImportResult]) -> str:
+    width = max(len(x.module) for x in results)
+    lines: list[str] = []
+    for x in results:
+        duration = f"{x.duration:.2f}s" if x.duration is not None else "-"
+        status = (
+            click.style(duration, fg="cyan")
+            if x.ok
+            else click.style(f"{duration} {x.error}", fg="red")
+        )
+        lines.append(f"  {x.module.ljust(width)} {status}")
+    return "\n".join(lines)
+
+
+async def verify_project(
+    adapters: list[str],
+    plugins: list[str],
+    project_root: "Path",
+    python_path: str,
+    jobs: int = 4,
+    timeout: float = 30,
+) -> bool:
+    click.secho("\n检查适配器和插件能否正常导入中", fg="yellow")
+    results = await verify_imports(
+        python_path,
+        project_root,
+        adapters,
+        plugins,
+        jobs=jobs,
+        timeout=timeout,
+    )
+    failed = [x for x in results if not x.ok]
+    title = (
+        click.style(f"导入失败（{len(failed)} 个）：", fg="red", bold=True)
+        if failed
+        else click.style(f"全部导入成功（{len(results)} 个）：", fg="green", bold=True)
+    )
+    click.echo(f"{title}\n{style_import_results(results)}")
+    return not failed
+
+
+async def rollback(
+    project_root: "Path",
+    snapshot_id: Optional[str],
+    python_path: str,
+    yes: bool = False,
+    verbose: bool = False,
+    wheelhouse: Optional["Path"] = WHEELHOUSE_DIR,
+) -> bool:
+    snapshot = load_snapshot(project_root, snapshot_id)
+    if not snapshot:
+        click.secho(
+            f"未找到更新快照 {snapshot_id}" if snapshot_id else "还没有任何更新快照",
+            fg="yellow",
+        )
+        if ids := list_snapshot_ids(project_root):
+            click.echo("可用的快照：\n" + "\n".join(f"  {x}" for x in ids))
+        return False
+
+    if not (changed := snapshot.changed):
+        click.secho(f"快照 {snapshot.id} 中没有版本变动，无需回滚", fg="green")
+        return True
+
+    rollback_title = click.style(
+        f"将回滚快照 {snapshot.id} 中的以下变动（{len(changed)} 个）：",
+        fg="yellow",
+        bold=True,
+    )
+    rollback_pkgs = style_change_dict(
+        {k: (after, before) for k, (before, after) in changed.items()},
+    )
+    click.echo(f"{rollback_title}\n{rollback_pkgs}")
+    if not (
+        yes
+        or await ConfirmPrompt(
+            "确定要回滚吗？",
+            default_choice=True,
+        ).prompt_async(style=CLI_DEFAULT_STYLE)
+    ):
+        return False
+
+    click.secho("回滚中", fg="yellow")
+    code, stderr = await rollback_snapshot(
+        snapshot,
+        python_path=python_path,
+        verbose=verbose,
+        wheelhouse=wheelhouse,
+    )
+    if code != 0:
+        click.secho(f"回滚失败！\n{stderr.rstrip()}", fg="red", bold=True, err=True)
+        return False
+    click.secho("回滚成功", fg="green", bold=True)
+    return True
+
+
+async def sync_project(
+    project_root: "Path",
+    python_path: str,
+    verbose: bool = False,
+) -> bool:
+    lock_path = get_lockfile_path(project_root)
+    if not lock_path.exists():
+        click.secho(
+            f"项目中没有锁文件 {LOCKFILE_NAME}，"
+            "请先使用 nb bootstrap --lock 创建项目",
+            fg="yellow",
+        )
+        return False
+
+    click.secho(f"正在按 {LOCKFILE_NAME} 安装依赖", fg="yellow")
+    code, _, stderr, report = await sync_lockfile(
+        lock_path,
+        python_path=python_path,
+        verbose=verbose,
+    )
+    if code != 0:
+        click.secho(f"安装失败！\n{stderr.rstrip()}", fg="red", bold=True, err=True)
+        return False
+    click.secho(f"安装成功，共 {len(report.versions)} 个包", fg="green", bold=True)
+    return True
+
+
+async def refresh_lockfile(
+    project_root: "Path",
+    requirements: list[str],
+    upgraded: list[str],
+    python_path: str,
+):
+    if not get_lockfile_path(project_root).exists():
+        return
+    click.secho("\n正在更新锁文件", fg="yellow")
+    code, stderr = await lock_project(
+        project_root,
+        requirements,
+        python_path=python_path,
+        upgrade=upgraded,
+    )
+    if code == 0:
+        click.secho(f"已更新锁文件 {LOCKFILE_NAME}", fg="green")
+    else:
+        click.secho(f"更新锁文件失败！\n{stderr.rstrip()}", fg="red", err=True)
+
+
 @requires_project_root
 @requires_pip
 async def update_project_handler(
     *,
     yes: bool = False,
     verbose: bool = False,
+    check: bool = False,
+    sync: bool = False,
+    jobs: int = 4,
+    wheelhouse: Optional["Path"] = None,
+    log_file: Optional["Path"] = None,
+    trace_file: Optional["Path"] = None,
+    rollback_id: Optional[str] = None,
+    verify: bool = False,
+    verify_timeout: float = 30,
     python_path: Optional[str] = None,
-    cwd: Optional["Path"] = None,  # noqa: ARG001
+    cwd: Optional["Path"] = None,
 ):
     bot_config = get_nonebot_config()
+    project_root = get_project_root(cwd)
     if python_path is None:
         python_path = await get_default_python()
 
-    pkgs = [
-        *guess_adapter_pkg_name([x.module_name for x in bot_config.adapters]),
-        *(normalize_pkg_name(x) for x in bot_config.plugins),
-    ]
+    if rollback_id is not None:  # 空字符串表示回滚最近一次
+        with spool_output(log_file), tracing(trace_file):
+            await rollback(
+                project_root,
+                rollback_id or None,
+                python_path,
+                yes=yes,
+                verbose=verbose,
+                wheelhouse=wheelhouse or WHEELHOUSE_DIR,
+            )
+        return
+
+    if sync:
+        with spool_output(log_file), tracing(trace_file):
+            await sync_project(project_root, python_path, verbose=verbose)
+        return
+
+    pkgs = await get_project_packages(
+        [x.module_name for x in bot_config.adapters],
+        bot_config.plugins,
+        python_path,
+    )
     if not pkgs:
         click.secho("你还没有安装过商店插件或适配器，没有需要更新的包", fg="green")
         return
 
+    click.secho("检查可更新的包中", fg="yellow")
+    installed = await list_all_packages(python_path)
+    checks = await check_versions(pkgs, installed, jobs=jobs)
+    # 只把确实装上了的包写进锁文件，猜错的包名会导致解析失败
+    lock_requirements = merge_requirements(
+        read_project_dependencies(project_root),
+        (x for x in pkgs if x in installed),
+    )
+    if check:
+        click.echo(style_version_checks(checks))
+        return
+
+    # 查不到最新版本时不能算作已是最新，交给安装器尝试更新
+    if unknown := [x for x in checks if not x.latest]:
+        click.echo(style_unknown_checks(unknown))
+        click.secho("以上包将直接尝试更新", fg="yellow")
+    pkgs = [x.name for x in checks if x.outdated or (not x.latest)]
+    if not pkgs:
+        click.secho("所有适配器和插件均已是最新版本", fg="green")
+        return
+
     if not (
         yes
         or await ConfirmPrompt(
@@ -182,17 +711,72 @@ async def update_project_handler(
     ):
         return
 
-    while True:
-        infos = await update(pkgs, python_path, verbose=verbose)
-        failed_infos = [x for x in infos if isinstance(x, FailInstallInfo)]
-        if (not failed_infos) or (
+    snapshot_ids_before = set(list_snapshot_ids(project_root))
+    upgraded: list[str] = []
+    with spool_output(log_file), tracing(trace_file):
+        while True:
+            infos = await update(
+                pkgs,
+                python_path,
+                verbose=verbose,
+                jobs=jobs,
+                wheelhouse=wheelhouse or WHEELHOUSE_DIR,
+                project_root=project_root,
+            )
+            upgraded.extend(x.name for x in infos if isinstance(x, SuccessInstallInfo))
+            pkgs = [  # 版本冲突重试也没用
+                x.name
+                for x in infos
+                if isinstance(x, FailInstallInfo) and (not x.is_conflict)
+            ]
+            if (not pkgs) or (
+                not (
+                    yes
+                    or await ConfirmPrompt(
+                        "部分包安装失败，是否重试？",
+                        default_choice=True,
+                    ).prompt_async(style=CLI_DEFAULT_STYLE)
+                )
+            ):
+                break
+
+        if (not verify) or await verify_project(
+            [x.module_name for x in bot_config.adapters],
+            bot_config.plugins,
+            project_root,
+            python_path,
+            jobs=jobs,
+            timeout=verify_timeout,
+        ):
+            if upgraded:
+                await refresh_lockfile(
+                    project_root,
+                    lock_requirements,
+                    upgraded,
+                    python_path,
+                )
+            return
+
+        new_snapshot_ids = sorted(
+            set(list_snapshot_ids(project_root)) - snapshot_ids_before,
+        )
+        if (not new_snapshot_ids) or (
             not (
                 yes
                 or await ConfirmPrompt(
-                    "部分包安装失败，是否重试？",
+                    "部分适配器或插件无法正常导入，是否回滚本次更新？",
                     default_choice=True,
                 ).prompt_async(style=CLI_DEFAULT_STYLE)
             )
         ):
-            break
-        pkgs = [x.name for x in failed_infos]
+            return
+        for snapshot_id in reversed(new_snapshot_ids):
+            if not await rollback(
+                project_root,
+                snapshot_id,
+                python_path,
+                yes=True,
+                verbose=verbose,
+                wheelhouse=wheelhouse or WHEELHOUSE_DIR,
+            ):
+                break
@@ -0,0 +1,134 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from cookit.pyd import type_dump_json, type_validate_json
+from pydantic import BaseModel
+
+from .const import PROJECT_STATE_DIR_NAME
+from .install import install_with_report
+from .report import InstallReport
+from .utils import call_pip_simp, use_uv, wait
+from .wheelhouse import WHEELHOUSE_DIR
+
+HISTORY_DIR_NAME = "history"
+
+
+class UpdateSnapshot(BaseModel):
+    id: str
+    created_at: datetime
+    targets: list[str]
+    failed: list[str]
+    before: dict[str, str]
+    after: dict[str, str]
+    installed: dict[str, str]
+
+    @property
+    def changed(self) -> dict[str, tuple[Optional[str], Optional[str]]]:
+        return {
+            k: (before, after)
+            for k in sorted(set(self.before) | set(self.after))
+            if (before := self.before.get(k)) != (after := self.after.get(k))
+        }
+
+
+def get_history_dir(project_root: Path) -> Path:
+    return project_root / PROJECT_STATE_DIR_NAME / HISTORY_DIR_NAME
+
+
+def create_snapshot(
+    targets: list[str],
+    failed: list[str],
+    before: dict[str, str],
+    after: dict[str, str],
+    reports: list[InstallReport],
+) -> UpdateSnapshot:
+    now = datetime.now()  # noqa: DTZ005
+    return UpdateSnapshot(
+        id=now.strftime("%Y%m%d-%H%M%S"),
+        created_at=now,
+        targets=targets,
+        failed=failed,
+        before=before,
+        after=after,
+        installed={k: v for x in reports for k, v in x.versions.items()},
+    )
+
+
+def save_snapshot(project_root: Path, snapshot: UpdateSnapshot) -> Path:
+    history_dir = get_history_dir(project_root)
+    history_dir.mkdir(parents=True, exist_ok=True)
+    base_id = snapshot.id
+    counter = 0
+    while (path := history_dir / f"{snapshot.id}.json").exists():
+        counter += 1
+        snapshot.id = f"{base_id}-{counter}"
+    path.write_text(type_dump_json(snapshot), "u8")
+    return path
+
+
+def list_snapshot_ids(project_root: Path) -> list[str]:
+    history_dir = get_history_dir(project_root)
+    if not history_dir.is_dir():
+        return []
+    return sorted(x.stem for x in history_dir.glob("*.json"))
+
+
+def load_snapshot(
+    project_root: Path,
+    snapshot_id: Optional[str] = None,
+) -> Optional[UpdateSnapshot]:
+    ids = list_snapshot_ids(project_root)
+    if not snapshot_id:
+        if not ids:
+            return None
+        snapshot_id = ids[-1]
+    elif snapshot_id not in ids:
+        return None
+    path = get_history_dir(project_root) / f"{snapshot_id}.json"
+    return type_validate_json(UpdateSnapshot, path.read_text("u8"))
+
+
+# 还原到快照记录的更新前版本，优先使用 wheelhouse 中缓存的 wheel
+async def rollback_snapshot(
+    snapshot: UpdateSnapshot,
+    python_path: Optional[str] = None,
+    verbose: bool = False,
+    wheelhouse: Optional[Path] = WHEELHOUSE_DIR,
+) -> tuple[int, str]:
+    changed = snapshot.changed
+    pins = [f"{k}=={before}" for k, (before, _) in changed.items() if before]
+    added = [k for k, (before, _) in changed.items() if not before]
+
+    if pins:
+        code = -1
+        stderr = ""
+        if wheelhouse and wheelhouse.is_dir():
+            code, _, stderr, _ = await install_with_report(
+                *("--no-index", "--find-links", str(wheelhouse), "--no-deps", *pins),
+                requested=pins,
+                python_path=python_path,
+                verbose=verbose,
+            )
+        if code != 0:
+            code, _, stderr, _ = await install_with_report(
+                *("--no-deps", *pins),
+                requested=pins,
+                python_path=python_path,
+                verbose=verbose,
+            )
+        if code != 0:
+            return code, stderr
+
+    if added:
+        uninstall_args = added if await use_uv() else ["-y", *added]
+        proc = await call_pip_simp(
+            "uninstall",
+            *uninstall_args,
+            python_path=python_path,
+        )
+        code, _, stderr = await wait(proc, verbose=verbose)
+        if code != 0:
+            return code, stderr
+
+    return 0, ""
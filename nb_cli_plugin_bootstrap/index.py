@@ -0,0 +1,258 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from html import unescape
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from nb_cli.consts import WINDOWS
+from nb_cli.handlers import get_default_python
+from packaging.utils import canonicalize_name
+from packaging.version import InvalidVersion, Version
+
+from .const import CACHE_DIR
+from .discovery import find_interpreter, probe
+from .fs import atomic_write_text
+from .utils import uv_exists
+
+DEFAULT_INDEX_URL = "https://pypi.org/simple"
+INDEX_CACHE_DIR = CACHE_DIR / "index"
+SIMPLE_ACCEPT = (
+    "application/vnd.pypi.simple.v1+json, "
+    "application/vnd.pypi.simple.v1+html;q=0.2, "
+    "text/html;q=0.1"
+)
+SIMPLE_ANCHOR_REGEX = re.compile(r"<a\s([^>]*)>([^<]+)</a>", re.IGNORECASE)
+DIST_EXTENSIONS = (".whl", ".tar.gz", ".zip", ".tar.bz2", ".tgz")
+# 没有配置时 pip config get 会返回非 0，这里统一输出空字符串以便缓存
+PIP_INDEX_URL_SCRIPT = (
+    "import subprocess, sys; "
+    "r = subprocess.run([sys.executable, '-m', 'pip', 'config', 'get', "
+    "'global.index-url'], capture_output=True, text=True); "
+    "print(r.stdout.strip() if r.returncode == 0 else '')"
+)
+
+
+@dataclass
+class VersionCheck:
+    name: str
+    installed: Optional[str]
+    latest: Optional[str]
+
+    @property
+    def outdated(self) -> bool:
+        # 查不到最新版本时不确定能否更新，不当作可更新
+        if not self.latest:
+            return False
+        if not self.installed:
+            return True
+        try:
+            return Version(self.latest) > Version(self.installed)
+        except InvalidVersion:
+            return self.latest != self.installed
+
+
+async def get_index_url() -> str:
+    env_keys = ["PIP_INDEX_URL"]
+    if await uv_exists():
+        env_keys[:0] = ["UV_DEFAULT_INDEX", "UV_INDEX_URL"]
+    for key in env_keys:
+        if url := os.getenv(key):
+            return url
+
+    python_path = await get_default_python()
+    info = find_interpreter(python_path)
+    stamp = get_pip_config_stamp(info.path)
+    stdout = await probe(info, f"pip_index_url@{stamp}", "-c", PIP_INDEX_URL_SCRIPT)
+    return stdout or DEFAULT_INDEX_URL
+
+
+def get_pip_config_files(python_path: Optional[str]) -> list[Path]:
+    home = Path.home()
+    if WINDOWS:
+        program_data = os.getenv("PROGRAMDATA", "C:\\ProgramData")
+        files = [
+            Path(program_data) / "pip" / "pip.ini",
+            home / "pip" / "pip.ini",
+            Path(os.getenv("APPDATA", home)) / "pip" / "pip.ini",
+        ]
+        site_name = "pip.ini"
+    else:
+        xdg_dirs = os.getenv("XDG_CONFIG_DIRS", "/etc/xdg").split(":")
+        files = [
+            Path("/etc/pip.conf"),
+            *(Path(x) / "pip" / "pip.conf" for x in xdg_dirs if x),
+            home / ".pip" / "pip.conf",
+            Path(os.getenv("XDG_CONFIG_HOME", home / ".config")) / "pip" / "pip.conf",
+            home / "Library" / "Application Support" / "pip" / "pip.conf",
+        ]
+        site_name = "pip.conf"
+    if config_file := os.getenv("PIP_CONFIG_FILE"):
+        files.append(Path(config_file))
+    if python_path:  # 虚拟环境中的配置文件
+        files.append(Path(python_path).parent.parent / site_name)
+    return files
+
+
+# pip 的配置文件有变动时重新获取
+def get_pip_config_stamp(python_path: Optional[str]) -> str:
+    parts: list[str] = []
+    for path in get_pip_config_files(python_path):
+        try:
+            parts.append(f"{path}:{path.stat().st_mtime}")
+        except OSError:
+            continue
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:16]
+
+
+def parse_filename_version(filename: str, project: str) -> Optional[str]:
+    if filename.endswith(".whl"):
+        parts = filename.split("-")
+        return parts[1] if len(parts) >= 5 else None
+
+    ext = next((x for x in DIST_EXTENSIONS if filename.endswith(x)), None)
+    if not ext:
+        return None
+    name, _, version = filename[: -len(ext)].rpartition("-")
+    return version if canonicalize_name(name) == project else None
+
+
+def parse_simple_json(data: dict, project: str) -> list[str]:
+    return [
+        version
+        for file in data.get("files", [])
+        if (not file.get("yanked"))
+        and (version := parse_filename_version(file["filename"], project))
+    ]
+
+
+def parse_simple_html(text: str, project: str) -> list[str]:
+    return [
+        version
+        for attrs, filename in SIMPLE_ANCHOR_REGEX.findall(text)
+        if ("data-yanked" not in attrs)
+        and (version := parse_filename_version(unescape(filename).strip(), project))
+    ]
+
+
+def pick_latest_version(versions: list[str]) -> Optional[str]:
+    parsed: list[Version] = []
+    for version in set(versions):
+        try:
+            parsed.append(Version(version))
+        except InvalidVersion:
+            continue
+    stable = [x for x in parsed if not (x.is_prerelease or x.is_devrelease)]
+    candidates = stable or parsed
+    return str(max(candidates)) if candidates else None
+
+
+class IndexClient:
+    def __init__(
+        self,
+        index_url: str,
+        client: httpx.AsyncClient,
+        jobs: int = 8,
+        cache_dir: Path = INDEX_CACHE_DIR,
+    ):
+        self.index_url = index_url.rstrip("/")
+        self.client = client
+        self.unreachable = False  # 有请求因网络问题失败
+        self._semaphore = asyncio.Semaphore(jobs)
+        self.cache_dir = (
+            cache_dir / hashlib.sha256(self.index_url.encode()).hexdigest()[:16]
+        )
+
+    def _cache_path(self, project: str) -> Path:
+        return self.cache_dir / f"{project}.json"
+
+    def _load_cache(self, project: str) -> Optional[dict]:
+        try:
+            return json.loads(self._cache_path(project).read_text("u8"))
+        except Exception:
+            return None
+
+    def _save_cache(self, project: str, data: dict):
+        try:
+            atomic_write_text(self._cache_path(project), json.dumps(data))
+        except OSError:
+            pass
+
+    async def get_versions(self, name: str) -> Optional[list[str]]:
+        project = canonicalize_name(name)
+        cached = self._load_cache(project)
+
+        headers = {"Accept": SIMPLE_ACCEPT}
+        if cached:
+            if etag := cached.get("etag"):
+                headers["If-None-Match"] = etag
+            if last_modified := cached.get("last_modified"):
+                headers["If-Modified-Since"] = last_modified
+
+        async with self._semaphore:
+            try:
+                resp = await self.client.get(
+                    f"{self.index_url}/{project}/",
+                    headers=headers,
+                    follow_redirects=True,
+                )
+            except httpx.HTTPError:
+                self.unreachable = True
+                return cached["versions"] if cached else None
+
+        if resp.status_code == 304 and cached:
+            return cached["versions"]
+        if resp.status_code != 200:
+            return None
+
+        if "json" in resp.headers.get("Content-Type", ""):
+            versions = parse_simple_json(resp.json(), project)
+        else:
+            versions = parse_simple_html(resp.text, project)
+        self._save_cache(
+            project,
+            {
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "versions": versions,
+            },
+        )
+        return versions
+
+    async def get_latest_version(self, name: str) -> Optional[str]:
+        versions = await self.get_versions(name)
+        return pick_latest_version(versions) if versions else None
+
+
+async def check_versions(
+    packages: list[str],
+    installed: dict[str, str],
+    index_url: Optional[str] = None,
+    jobs: int = 8,
+) -> list[VersionCheck]:
+    # mirrors 依赖本模块，只能在这里导入
+    from .mirrors import get_index_chain, mark_index_failed
+
+    # 没有指定源时与安装一样，连不上时换用备用镜像源查询还没查到的包
+    chain = [index_url] if index_url else await get_index_chain()
+    latest_versions: dict[str, Optional[str]] = {}
+    async with httpx.AsyncClient(timeout=10) as client:
+        for url in chain:
+            index = IndexClient(url or await get_index_url(), client, jobs=jobs)
+            pending = [x for x in packages if not latest_versions.get(x)]
+            results = await asyncio.gather(
+                *(index.get_latest_version(x) for x in pending),
+            )
+            latest_versions.update(zip(pending, results, strict=True))
+            if not index.unreachable:
+                break
+            if not index_url:
+                mark_index_failed(url)
+    return [
+        VersionCheck(pkg, installed.get(pkg), latest_versions.get(pkg))
+        for pkg in packages
+    ]
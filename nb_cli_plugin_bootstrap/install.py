@@ -0,0 +1,156 @@
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from .mirrors import run_with_failover
+from .report import InstallReport
+from .trace import packages_label, span_label
+from .utils import (
+    FailInstallInfo,
+    InstallInfoType,
+    SuccessInstallInfo,
+    call_pip_update_simp,
+    is_network_error_output,
+    use_uv,
+    wait,
+)
+from .wheelhouse import WHEELHOUSE_DIR, fill_wheelhouse
+
+
+async def install_from_index(
+    *pip_args: str,
+    requested: list[str],
+    python_path: Optional[str] = None,
+    verbose: bool = False,
+    index_url: Optional[str] = None,
+) -> tuple[int, str, str, InstallReport]:
+    report = InstallReport()
+    if await use_uv():
+        proc = await call_pip_update_simp(
+            *pip_args,
+            python_path=python_path,
+            index_url=index_url,
+        )
+        code, stdout, stderr = await wait(
+            proc,
+            verbose=verbose,
+            on_stderr_line=report.feed_uv_line,
+        )
+        report.finish_uv_output(requested)
+        return code, stdout, stderr, report
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        report_path = Path(temp_dir) / "report.json"
+        proc = await call_pip_update_simp(
+            *(*pip_args, "--report", str(report_path)),
+            python_path=python_path,
+            index_url=index_url,
+        )
+        code, stdout, stderr = await wait(
+            proc,
+            verbose=verbose,
+            on_stdout_line=report.feed_pip_line,
+        )
+        report.load_pip_report_file(report_path)
+    return code, stdout, stderr, report
+
+
+async def install_with_report(
+    *pip_args: str,
+    requested: list[str],
+    python_path: Optional[str] = None,
+    verbose: bool = False,
+) -> tuple[int, str, str, InstallReport]:
+    async def run(index_url: Optional[str]) -> tuple[int, str, str, InstallReport]:
+        return await install_from_index(
+            *pip_args,
+            requested=requested,
+            python_path=python_path,
+            verbose=verbose,
+            index_url=index_url,
+        )
+
+    if "--no-index" in pip_args:
+        return await run(None)
+    return await run_with_failover(
+        run,
+        lambda x: x[0] != 0 and is_network_error_output(x[2]),
+    )
+
+
+# 先并发下载或构建所有 wheel 到 wheelhouse，再一次性离线安装
+# uv 本身会并发下载并共享缓存，不需要这一步
+async def install_packages(
+    pkgs: list[str],
+    python_path: Optional[str] = None,
+    verbose: bool = False,
+    jobs: int = 4,
+    wheelhouse: Optional[Path] = WHEELHOUSE_DIR,
+) -> tuple[int, str, str, InstallReport]:
+    # 下载 wheel 时各个进程按包名记录，安装时记为一整批
+    if wheelhouse and (not await use_uv()):
+        fetched = InstallReport()
+        failed = await fill_wheelhouse(
+            pkgs,
+            wheelhouse,
+            python_path,
+            jobs=jobs,
+            report=fetched,
+        )
+        if not failed:
+            with span_label(packages_label(pkgs)):
+                result = await install_with_report(
+                    *("--no-index", "--find-links", str(wheelhouse), *pkgs),
+                    requested=pkgs,
+                    python_path=python_path,
+                    verbose=verbose,
+                )
+            if result[0] == 0:
+                result[3].merge_fetched(fetched.fetched)
+                return result
+
+    # 离线安装失败时回退到在线安装
+    with span_label(packages_label(pkgs)):
+        return await install_with_report(
+            *pkgs,
+            requested=pkgs,
+            python_path=python_path,
+            verbose=verbose,
+        )
+
+
+async def update_packages(
+    pkgs: list[str],
+    python_path: Optional[str] = None,
+    verbose: bool = False,
+    jobs: int = 4,
+    wheelhouse: Optional[Path] = WHEELHOUSE_DIR,
+) -> list[InstallInfoType]:
+    if verbose:
+        print()
+    code, stdout, stderr, report = await install_packages(
+        pkgs,
+        python_path=python_path,
+        verbose=verbose,
+        jobs=jobs,
+        wheelhouse=wheelhouse,
+    )
+    if code == 0:
+        return [SuccessInstallInfo(pkg, stdout, stderr, report) for pkg in pkgs]
+    return [FailInstallInfo(pkg, stdout, stderr) for pkg in pkgs]
+
+
+async def update_package(
+    pkg: str,
+    python_path: Optional[str] = None,
+    verbose: bool = False,
+    wheelhouse: Optional[Path] = WHEELHOUSE_DIR,
+) -> InstallInfoType:
+    return (
+        await update_packages(
+            [pkg],
+            python_path,
+            verbose=verbose,
+            wheelhouse=wheelhouse,
+        )
+    )[0]
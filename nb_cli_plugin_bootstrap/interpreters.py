@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+import findpython
+from cookit.pyd import type_dump_json, type_validate_json
+from findpython.providers import RyeProvider
+from packaging.version import InvalidVersion, Version
+from pydantic import BaseModel
+
+from .const import CACHE_DIR
+from .discovery import run_probe
+from .fs import atomic_write_text
+
+INTERPRETERS_CACHE_PATH = CACHE_DIR / "interpreters.json"
+INTERPRETER_PROBE_SCRIPT = (
+    "import json, platform; "
+    "print(json.dumps([platform.python_version(), platform.python_implementation()]))"
+)
+INTERPRETER_PROBE_TIMEOUT = 5
+# pyenv、asdf 等工具的 shim 文件本身不会变，实际运行的解释器却随配置和当前目录变化
+SHIM_DIR_NAME = "shims"
+
+
+class InterpreterInfo(BaseModel):
+    executable: str
+    size: int
+    mtime: float
+    # 无法运行的解释器也记录下来，避免每次都重新探测
+    version: Optional[str] = None
+    implementation: Optional[str] = None
+
+    @property
+    def parsed_version(self) -> Optional[Version]:
+        if not self.version:
+            return None
+        try:
+            return Version(self.version)
+        except InvalidVersion:
+            return None
+
+
+class InterpreterInventory(BaseModel):
+    interpreters: dict[str, InterpreterInfo] = {}
+
+
+def load_inventory() -> InterpreterInventory:
+    try:
+        return type_validate_json(
+            InterpreterInventory,
+            INTERPRETERS_CACHE_PATH.read_text("u8"),
+        )
+    except Exception:
+        return InterpreterInventory()
+
+
+def save_inventory(inventory: InterpreterInventory):
+    try:
+        atomic_write_text(INTERPRETERS_CACHE_PATH, type_dump_json(inventory))
+    except OSError:
+        pass
+
+
+# 只列出各个来源中的可执行文件，不运行它们
+# Finder.find_all 会运行每个解释器来匹配版本，所以直接遍历各个来源
+def list_interpreter_candidates(uv_python_path: Optional[Path] = None) -> list[str]:
+    providers = findpython.Finder().setup_providers()
+    if uv_python_path:
+        providers.insert(0, RyeProvider(uv_python_path))
+    return list(
+        dict.fromkeys(
+            str(x.executable) for provider in providers for x in provider.find_pythons()
+        ),
+    )
+
+
+def is_shim(executable: str) -> bool:
+    return Path(executable).parent.name == SHIM_DIR_NAME
+
+
+async def probe_interpreter(
+    executable: str,
+    size: int,
+    mtime: float,
+) -> Optional[InterpreterInfo]:
+    try:
+        stdout = await run_probe(
+            *(executable, "-I", "-c", INTERPRETER_PROBE_SCRIPT),
+            timeout=INTERPRETER_PROBE_TIMEOUT,
+        )
+    except asyncio.TimeoutError:  # 可能只是机器太忙，不记录
+        return None
+    info = InterpreterInfo(executable=executable, size=size, mtime=mtime)
+    if stdout:
+        try:
+            info.version, implementation = json.loads(stdout.splitlines()[-1])
+            info.implementation = implementation.lower()
+        except ValueError:
+            pass
+    return info
+
+
+async def find_interpreters(
+    uv_python_path: Optional[Path] = None,
+    jobs: int = 8,
+) -> list[InterpreterInfo]:
+    inventory = load_inventory()
+    semaphore = asyncio.Semaphore(jobs)
+
+    async def get_info(executable: str) -> Optional[InterpreterInfo]:
+        try:
+            stat = os.stat(executable)
+        except OSError:
+            return None
+        # shim 每次都重新探测，也不写入缓存
+        cached = None if is_shim(executable) else inventory.interpreters.get(executable)
+        if cached and (cached.size, cached.mtime) == (stat.st_size, stat.st_mtime):
+            return cached
+        async with semaphore:
+            return await probe_interpreter(executable, stat.st_size, stat.st_mtime)
+
+    candidates = list_interpreter_candidates(uv_python_path)
+    infos = [x for x in await asyncio.gather(*map(get_info, candidates)) if x]
+
+    new_inventory = InterpreterInventory(
+        interpreters={x.executable: x for x in infos if not is_shim(x.executable)},
+    )
+    if new_inventory != inventory:
+        save_inventory(new_inventory)
+
+    return sorted(
+        (x for x in infos if x.parsed_version),
+        key=lambda x: x.parsed_version,  # type: ignore
+        reverse=True,
+    )
@@ -0,0 +1,149 @@
+import tempfile
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Optional
+
+import tomlkit
+from packaging.requirements import InvalidRequirement, Requirement
+
+from .const import LOCKFILE_NAME
+from .install import install_with_report
+from .report import InstallReport
+from .utils import call_pip_simp, call_pip_update_simp, normalize_pkg_name, use_uv, wait
+
+LOCKFILE_HEADER = "# 由 nb-cli-plugin-bootstrap 生成，请使用 nb update-project 更新\n"
+
+
+def get_lockfile_path(project_root: Path) -> Path:
+    return project_root / LOCKFILE_NAME
+
+
+def get_requirement_name(requirement: str) -> str:
+    try:
+        return normalize_pkg_name(Requirement(requirement).name)
+    except InvalidRequirement:
+        return requirement
+
+
+def merge_requirements(*groups: Iterable[str]) -> list[str]:
+    merged: dict[str, str] = {}
+    for requirement in (x for group in groups for x in group):
+        merged.setdefault(get_requirement_name(requirement), requirement)
+    return list(merged.values())
+
+
+def read_project_dependencies(project_root: Path) -> list[str]:
+    try:
+        data = tomlkit.parse((project_root / "pyproject.toml").read_text("u8"))
+    except Exception:
+        return []
+    return [str(x) for x in data.get("project", {}).get("dependencies", [])]
+
+
+def read_lockfile(path: Path) -> dict[str, str]:
+    pins: dict[str, str] = {}
+    for line in path.read_text("u8").splitlines():
+        line = line.partition("#")[0].strip()
+        if (not line) or line.startswith("-"):
+            continue
+        name, sep, version = line.partition("==")
+        if sep:
+            name = normalize_pkg_name(name.partition("[")[0].strip())
+            pins[name] = version.partition(";")[0].strip()
+    return pins
+
+
+def write_lockfile(path: Path, pins: dict[str, str]):
+    lines = "".join(f"{k}=={v}\n" for k, v in sorted(pins.items()))
+    path.write_text(f"{LOCKFILE_HEADER}{lines}", "u8")
+
+
+async def resolve_lock_uv(
+    requirements_path: Path,
+    pins: dict[str, str],
+    upgrade: list[str],
+    python_path: Optional[str] = None,
+) -> tuple[int, str, dict[str, str]]:
+    # uv 会把 -o 指定的已有文件当作首选版本，只重新解析 --upgrade-package 的包
+    output_path = requirements_path.with_name(LOCKFILE_NAME)
+    if pins:
+        write_lockfile(output_path, pins)
+    proc = await call_pip_simp(
+        *("compile", str(requirements_path), "-o", str(output_path), "--no-header"),
+        *(x for pkg in upgrade for x in ("--upgrade-package", pkg)),
+        python_path=python_path,
+    )
+    code, _, stderr = await wait(proc)
+    return code, stderr, (read_lockfile(output_path) if code == 0 else {})
+
+
+async def resolve_lock_pip(
+    requirements_path: Path,
+    pins: dict[str, str],
+    upgrade: list[str],
+    python_path: Optional[str] = None,
+) -> tuple[int, str, dict[str, str]]:
+    report_path = requirements_path.with_name("report.json")
+    constraints_path = requirements_path.with_name("constraints.txt")
+    upgrade = [normalize_pkg_name(x) for x in upgrade]
+    constraints = {k: v for k, v in pins.items() if k not in upgrade}
+    write_lockfile(constraints_path, constraints)
+
+    async def resolve(constrained: bool) -> tuple[int, str]:
+        proc = await call_pip_update_simp(
+            *("--dry-run", "--ignore-installed", "--quiet"),
+            *("-r", str(requirements_path), "--report", str(report_path)),
+            *(("-c", str(constraints_path)) if constrained else ()),
+            python_path=python_path,
+        )
+        code, _, stderr = await wait(proc)
+        return code, stderr
+
+    code, stderr = await resolve(bool(constraints))
+    if code != 0 and constraints:  # 旧版本与升级后的包冲突时完整重新解析
+        code, stderr = await resolve(False)
+    if code != 0:
+        return code, stderr, {}
+    report = InstallReport()
+    report.load_pip_report_file(report_path)
+    return code, stderr, report.versions
+
+
+async def lock_project(
+    project_root: Path,
+    requirements: list[str],
+    python_path: Optional[str] = None,
+    upgrade: Optional[list[str]] = None,
+) -> tuple[int, str]:
+    lock_path = get_lockfile_path(project_root)
+    # 不指定 upgrade 时完整重新解析
+    pins = (
+        read_lockfile(lock_path) if (upgrade is not None and lock_path.exists()) else {}
+    )
+    resolver = resolve_lock_uv if await use_uv() else resolve_lock_pip
+    with tempfile.TemporaryDirectory() as temp_dir:
+        requirements_path = Path(temp_dir) / "requirements.in"
+        requirements_path.write_text("".join(f"{x}\n" for x in requirements), "u8")
+        code, stderr, new_pins = await resolver(
+            requirements_path,
+            pins,
+            upgrade or [],
+            python_path,
+        )
+    if code == 0:
+        write_lockfile(lock_path, new_pins)
+    return code, stderr
+
+
+# 锁文件中已经是完整的依赖集合，不需要再解析依赖
+async def sync_lockfile(
+    lock_path: Path,
+    python_path: Optional[str] = None,
+    verbose: bool = False,
+) -> tuple[int, str, str, InstallReport]:
+    return await install_with_report(
+        *("--no-deps", "-r", str(lock_path)),
+        requested=list(read_lockfile(lock_path)),
+        python_path=python_path,
+        verbose=verbose,
+    )
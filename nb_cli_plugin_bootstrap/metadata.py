@@ -0,0 +1,233 @@
+import csv
+import hashlib
+import json
+import os
+from collections.abc import Iterable
+from contextlib import suppress
+from dataclasses import asdict, dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Optional
+
+from .const import CACHE_DIR
+from .discovery import find_interpreter, get_stored_value, probe, store_value
+from .fs import atomic_write_text
+
+SYS_PATH_SCRIPT = "import json, sys; print(json.dumps([x for x in sys.path if x]))"
+SITE_DIR_NAMES = ("site-packages", "dist-packages")
+METADATA_DIR_SUFFIXES = (".dist-info", ".egg-info")
+METADATA_CACHE_PATH = CACHE_DIR / "metadata.json"
+MODULE_SUFFIXES = (".py", ".so", ".pyd")
+
+
+@dataclass
+class DistInfo:
+    name: str
+    version: str
+    mtime: float
+    modules: list[str] = field(default_factory=list)
+
+
+@dataclass
+class SiteDirCache:
+    mtime: float
+    dists: dict[str, DistInfo] = field(default_factory=dict)
+
+
+_site_dir_caches: dict[Path, SiteDirCache] = {}
+_cache_loaded = False
+_cache_dirty = False
+
+
+def load_metadata_cache():
+    global _cache_loaded
+    if _cache_loaded:
+        return
+    _cache_loaded = True
+    try:
+        data = json.loads(METADATA_CACHE_PATH.read_text("u8"))
+        for path, cache in data.items():
+            _site_dir_caches.setdefault(
+                Path(path),
+                SiteDirCache(
+                    cache["mtime"],
+                    {k: DistInfo(**v) for k, v in cache["dists"].items()},
+                ),
+            )
+    except Exception:
+        pass  # 缓存损坏时重新读取即可
+
+
+def save_metadata_cache():
+    global _cache_dirty
+    if not _cache_dirty:
+        return
+    _cache_dirty = False
+    data = {str(k): asdict(v) for k, v in _site_dir_caches.items() if k.is_dir()}
+    try:
+        atomic_write_text(METADATA_CACHE_PATH, json.dumps(data))
+    except OSError:
+        pass
+
+
+# 增删 .pth 文件会改变所在 site-packages 目录的修改时间，用作 sys.path 缓存的校验值
+def get_site_dirs_stamp(sys_paths: Iterable[str]) -> str:
+    parts: list[str] = []
+    for x in sys_paths:
+        path = Path(x)
+        if path.name not in SITE_DIR_NAMES:
+            continue
+        with suppress(OSError):
+            parts.append(f"{path}:{path.stat().st_mtime}")
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:16]
+
+
+async def get_sys_paths(python_path: str) -> list[Path]:
+    info = find_interpreter(python_path)
+    cached = get_stored_value(info, "sys_path")
+    stamp = get_site_dirs_stamp(json.loads(cached) if cached else [])
+    stdout = await probe(info, f"sys_path@{stamp}", "-c", SYS_PATH_SCRIPT)
+    if stdout is None:
+        raise RuntimeError(f"Failed to get sys.path of {python_path}")
+    sys_paths: list[str] = json.loads(stdout)
+    # 探测前不知道有哪些 site-packages 目录，按探测结果重新记录校验值
+    if (new_stamp := get_site_dirs_stamp(sys_paths)) != stamp:
+        store_value(info, f"sys_path@{new_stamp}", stdout)
+    return [p for x in sys_paths if (p := Path(x)).is_dir()]
+
+
+def read_metadata_headers(path: Path) -> tuple[Optional[str], Optional[str]]:
+    name = version = None
+    with path.open(encoding="u8", errors="replace") as f:
+        for line in f:
+            if not line.strip():  # 头部结束
+                break
+            key, _, value = line.partition(":")
+            if key == "Name":
+                name = value.strip()
+            elif key == "Version":
+                version = value.strip()
+            if name and version:
+                break
+    return name, version
+
+
+# RECORD 中的文件路径转换为模块名，包括各级包，数据文件只记录所在的包
+def get_record_modules(paths: Iterable[str]) -> set[str]:
+    modules: set[str] = set()
+    for path in paths:
+        pure_path = PurePosixPath(path)
+        if pure_path.is_absolute() or (not pure_path.parts):
+            continue
+        *dirs, name = pure_path.parts
+        # 排除 .dist-info、../bin 等
+        if "__pycache__" in dirs or not all(x.isidentifier() for x in dirs):
+            continue
+        modules.update(".".join(dirs[: i + 1]) for i in range(len(dirs)))
+        stem = name.partition(".")[0]
+        if (
+            name.endswith(MODULE_SUFFIXES)
+            and stem.isidentifier()
+            and stem != "__init__"
+        ):
+            modules.add(".".join([*dirs, stem]))
+    return modules
+
+
+def read_dist_modules(path: Path) -> list[str]:
+    modules: set[str] = set()
+    with suppress(OSError):
+        modules.update(
+            x.strip().replace("/", ".")
+            for x in (path / "top_level.txt").read_text("u8").splitlines()
+            if x.strip()
+        )
+    with suppress(OSError, csv.Error):
+        with (path / "RECORD").open(encoding="u8", newline="") as f:
+            rows = list(csv.reader(f))
+        modules.update(get_record_modules(row[0] for row in rows if row))
+    return sorted(modules)
+
+
+def read_dist_info(path: Path, mtime: float) -> Optional[DistInfo]:
+    metadata_path = (
+        path  # 单文件形式的 .egg-info
+        if path.is_file()
+        else next(
+            (p for x in ("METADATA", "PKG-INFO") if (p := path / x).is_file()),
+            None,
+        )
+    )
+    if not metadata_path:
+        return None
+
+    try:
+        name, version = read_metadata_headers(metadata_path)
+    except OSError:
+        return None
+    if not (name and version):
+        return None
+    modules = read_dist_modules(path) if path.is_dir() else []
+    return DistInfo(name, version, mtime, modules)
+
+
+def read_site_dir(path: Path) -> dict[str, DistInfo]:
+    global _cache_dirty
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return {}
+
+    cache = _site_dir_caches.get(path)
+    if cache and cache.mtime == mtime:
+        return cache.dists
+
+    # 目录有变动时，只重新读取有变动的元数据
+    old_dists = cache.dists if cache else {}
+    new_cache = SiteDirCache(mtime)
+    with os.scandir(path) as it:
+        for entry in it:
+            if not entry.name.endswith(METADATA_DIR_SUFFIXES):
+                continue
+            try:
+                entry_mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            if (info := old_dists.get(entry.name)) and info.mtime == entry_mtime:
+                new_cache.dists[entry.name] = info
+            elif info := read_dist_info(Path(entry.path), entry_mtime):
+                new_cache.dists[entry.name] = info
+
+    _site_dir_caches[path] = new_cache
+    _cache_dirty = True
+    return new_cache.dists
+
+
+# 缓存保存在磁盘上，之后只重新读取有变动的目录和元数据
+async def read_environment(python_path: str) -> list[DistInfo]:
+    sys_paths = await get_sys_paths(python_path)
+    load_metadata_cache()
+    dists = [info for path in sys_paths for info in read_site_dir(path).values()]
+    save_metadata_cache()
+    return dists
+
+
+async def read_installed_distributions(python_path: str) -> list[tuple[str, str]]:
+    return [(info.name, info.version) for info in await read_environment(python_path)]
+
+
+# 模块名 -> 提供了该模块或其中文件的发行包
+async def build_module_index(python_path: str) -> dict[str, list[str]]:
+    owners: dict[str, set[str]] = {}
+    for info in await read_environment(python_path):
+        for module in info.modules:
+            owners.setdefault(module, set()).add(info.name)
+    return {k: sorted(v) for k, v in owners.items()}
+
+
+# 多个包共用的命名空间（如 nonebot.adapters）无法确定归属
+def find_module_distribution(
+    index: dict[str, list[str]],
+    module: str,
+) -> Optional[str]:
+    owners = index.get(module)
+    return owners[0] if owners and len(owners) == 1 else None
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import math
+import re
+import time
+from collections.abc import Awaitable
+from contextlib import suppress
+from dataclasses import dataclass
+from html import unescape
+from typing import Callable, Optional, TypeVar
+from urllib.parse import urljoin, urlsplit
+
+import click
+import httpx
+
+from .const import CONFIG_DIR
+from .fs import atomic_write_text
+from .index import SIMPLE_ACCEPT, SIMPLE_ANCHOR_REGEX, get_index_url
+
+T = TypeVar("T")
+
+# 各镜像源都会有 pip，而且它的 wheel 足够大，能测出下载速度
+PROBE_PROJECT = "pip"
+PROBE_TIMEOUT = 5
+PROBE_SAMPLE_SIZE = 1024 * 1024
+# 排序时按下载一个这么大的包估算总耗时
+PROBE_REFERENCE_SIZE = 4 * 1024 * 1024
+SIMPLE_HREF_REGEX = re.compile(r"""href\s*=\s*["']([^"']+)["']""", re.IGNORECASE)
+MIRROR_CHAIN_PATH = CONFIG_DIR / "mirrors.json"
+FAILOVER_BACKOFF = 1
+FAILOVER_BACKOFF_MAX = 16
+
+# 本次运行中因网络问题失败过的源，None 表示 pip / uv 自身配置的源
+_failed_indexes: set[Optional[str]] = set()
+
+
+@dataclass
+class MirrorProbe:
+    name: str
+    url: str
+    connect_time: Optional[float] = None
+    index_time: Optional[float] = None
+    throughput: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def reachable(self) -> bool:
+        return self.error is None
+
+    @property
+    def score(self) -> float:
+        if not self.reachable:
+            return math.inf
+        total = (self.connect_time or 0) + (self.index_time or 0)
+        if self.throughput:
+            total += PROBE_REFERENCE_SIZE / self.throughput
+        else:
+            total += PROBE_TIMEOUT  # 没测出下载速度时按最慢算
+        return total
+
+    def describe(self) -> str:
+        if self.error:
+            return f"不可用（{self.error}）"
+        parts: list[str] = []
+        if self.connect_time is not None:
+            parts.append(f"连接 {self.connect_time * 1000:.0f}ms")
+        if self.index_time is not None:
+            parts.append(f"索引 {self.index_time * 1000:.0f}ms")
+        if self.throughput:
+            parts.append(f"下载 {format_throughput(self.throughput)}")
+        return "，".join(parts)
+
+
+def format_throughput(throughput: float) -> str:
+    if throughput >= 1024 * 1024:
+        return f"{throughput / 1024 / 1024:.1f} MB/s"
+    return f"{throughput / 1024:.0f} KB/s"
+
+
+def format_error(e: BaseException) -> str:
+    if isinstance(e, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return "超时"
+    return str(e) or type(e).__name__
+
+
+# 取列表中最后一个 wheel，一般是最新版本
+def find_sample_file(resp: httpx.Response) -> Optional[str]:
+    links: list[str] = []
+    if "json" in resp.headers.get("Content-Type", ""):
+        links.extend(
+            file["url"]
+            for file in resp.json().get("files", [])
+            if file.get("filename", "").endswith(".whl") and (not file.get("yanked"))
+        )
+    else:
+        for attrs, filename in SIMPLE_ANCHOR_REGEX.findall(resp.text):
+            if (not unescape(filename).strip().endswith(".whl")) or (
+                "data-yanked" in attrs
+            ):
+                continue
+            if match := SIMPLE_HREF_REGEX.search(attrs):
+                links.append(unescape(match[1]))
+    if not links:
+        return None
+    return urljoin(str(resp.url), links[-1]).partition("#")[0]
+
+
+async def measure_connect(url: str, timeout: float = PROBE_TIMEOUT) -> float:
+    parts = urlsplit(url)
+    https = parts.scheme == "https"
+    start = time.perf_counter()
+    _, writer = await asyncio.wait_for(
+        asyncio.open_connection(
+            parts.hostname,
+            parts.port or (443 if https else 80),
+            ssl=https or None,
+        ),
+        timeout,
+    )
+    elapsed = time.perf_counter() - start
+    writer.close()
+    with suppress(Exception):
+        await writer.wait_closed()
+    return elapsed
+
+
+async def measure_throughput(
+    client: httpx.AsyncClient,
+    url: str,
+    timeout: float = PROBE_TIMEOUT,
+) -> Optional[float]:
+    size = 0
+    async with client.stream("GET", url, follow_redirects=True) as resp:
+        if resp.status_code != 200:
+            return None
+        # 从收到响应头开始计时，不把首包延迟算进下载速度
+        start = time.perf_counter()
+        async for chunk in resp.aiter_bytes():
+            size += len(chunk)
+            if size >= PROBE_SAMPLE_SIZE or time.perf_counter() - start > timeout:
+                break
+        elapsed = time.perf_counter() - start
+    return (size / elapsed) if size and elapsed > 0 else None
+
+
+async def probe_mirror(
+    client: httpx.AsyncClient,
+    name: str,
+    url: str,
+    timeout: float = PROBE_TIMEOUT,
+) -> MirrorProbe:
+    result = MirrorProbe(name, url)
+    # 走代理时可能无法直连，只要索引能访问就不算失败
+    with suppress(OSError, ValueError, asyncio.TimeoutError):
+        result.connect_time = await measure_connect(url, timeout)
+
+    start = time.perf_counter()
+    try:
+        resp = await client.get(
+            f"{url.rstrip('/')}/{PROBE_PROJECT}/",
+            headers={"Accept": SIMPLE_ACCEPT},
+            follow_redirects=True,
+        )
+    except httpx.HTTPError as e:
+        result.error = format_error(e)
+        return result
+    result.index_time = time.perf_counter() - start
+    if resp.status_code != 200:
+        result.error = f"HTTP {resp.status_code}"
+        return result
+
+    try:
+        sample_url = find_sample_file(resp)
+    except ValueError:
+        sample_url = None
+    if not sample_url:
+        result.error = f"索引中没有 {PROBE_PROJECT}"
+        return result
+    with suppress(httpx.HTTPError):
+        result.throughput = await measure_throughput(client, sample_url, timeout)
+    return result
+
+
+# 同时测试所有镜像源，按估算耗时排序，不可用的排在最后
+async def probe_mirrors(
+    mirrors: list[tuple[str, str]],
+    timeout: float = PROBE_TIMEOUT,
+) -> list[MirrorProbe]:
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        results = await asyncio.gather(
+            *(probe_mirror(client, name, url, timeout) for name, url in mirrors),
+        )
+    return sorted(results, key=lambda x: x.score)
+
+
+def load_mirror_chain() -> list[str]:
+    try:
+        data = json.loads(MIRROR_CHAIN_PATH.read_text("u8"))
+    except Exception:
+        return []
+    return [x for x in data if isinstance(x, str)] if isinstance(data, list) else []
+
+
+def save_mirror_chain(urls: list[str]):
+    # 用户的配置，写入失败时交给调用方提示
+    atomic_write_text(MIRROR_CHAIN_PATH, json.dumps(urls, indent=2))
+
+
+# 先用 pip / uv 自身配置的源，出现网络错误时再依次换用配置的镜像源
+# 失败过的源之后直接跳过，全都失败过时只再试最后一个
+async def get_index_chain() -> list[Optional[str]]:
+    if not (mirrors := load_mirror_chain()):
+        return [None]
+    current = (await get_index_url()).rstrip("/")
+    chain: list[Optional[str]] = [None]
+    chain.extend(x for x in mirrors if x.rstrip("/") != current)
+    return [x for x in chain if x not in _failed_indexes] or chain[-1:]
+
+
+def mark_index_failed(url: Optional[str]):
+    _failed_indexes.add(url)
+
+
+def get_backoff_delay(attempt: int) -> float:
+    return min(FAILOVER_BACKOFF * 2**attempt, FAILOVER_BACKOFF_MAX)
+
+
+# 网络出错时按配置的顺序换源重试，其他错误换源也没用
+async def run_with_failover(
+    run: Callable[[Optional[str]], Awaitable[T]],
+    is_network_error: Callable[[T], bool],
+) -> T:
+    for i, index_url in enumerate(await get_index_chain()):
+        if i:
+            delay = get_backoff_delay(i - 1)
+            click.secho(
+                f"连接 PyPI 源失败，{delay:g} 秒后换用 {index_url} 重试",
+                fg="yellow",
+                err=True,
+            )
+            await asyncio.sleep(delay)
+        result = await run(index_url)
+        if not is_network_error(result):
+            break
+        mark_index_failed(index_url)
+    return result
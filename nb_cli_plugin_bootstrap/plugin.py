@@ -1,8 +1,11 @@
+from pathlib import Path
 from typing import Optional, cast
 
 import click
 from nb_cli.cli import ClickAliasedGroup, cli as cli_, run_async
 
+from .const import LOCKFILE_NAME, VENV_BACKEND_NAMES
+
 cli = cast(ClickAliasedGroup, cli_)
 
 
@@ -15,6 +18,32 @@ cli = cast(ClickAliasedGroup, cli_)
 @click.option("-y", "--yes", is_flag=True, help="全部使用默认选项")
 @click.option("-v", "--verbose", is_flag=True, help="显示更多输出")
 @click.option("--venv/--no-venv", default=None, help="指定是否创建虚拟环境")
+@click.option(
+    "--venv-backend",
+    type=click.Choice(VENV_BACKEND_NAMES),
+    default=None,
+    help="指定创建虚拟环境使用的工具，默认自动选择可用的最快的一个",
+)
+@click.option(
+    "--from",
+    "spec_file",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="按 TOML 配置文件批量创建项目，此时忽略项目名称与 -a 等交互相关的选项",
+)
+@click.option(
+    "--resume",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    default=None,
+    help="从上次失败的步骤继续配置指定文件夹中的项目",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="批量创建项目时同时进行的最大项目数",
+)
 @click.option(
     "-a",
     "--adapter",
@@ -22,14 +51,92 @@ cli = cast(ClickAliasedGroup, cli_)
     default=[],
     help="指定要安装的适配器名称/包名/模块名",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="并发下载依赖的最大任务数",
+)
+@click.option(
+    "--wheelhouse",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help="存放预先下载的 wheel 的目录，默认使用全局共享目录",
+)
+@click.option(
+    "--speculative",
+    is_flag=True,
+    help="回答问题的同时在后台提前安装依赖，需要能自动创建虚拟环境（--venv 或 -y）",
+)
+@click.option(
+    "--golden",
+    is_flag=True,
+    help=(
+        "从缓存的相同解释器与依赖的环境克隆虚拟环境，之后只补装缺少的包"
+        "（缓存的环境 7 天后重建，Windows 上不可用）"
+    ),
+)
+@click.option(
+    "--lock",
+    is_flag=True,
+    help=f"解析一次依赖并写入项目中的 {LOCKFILE_NAME}，之后按锁文件安装",
+)
+@click.option(
+    "--offline",
+    is_flag=True,
+    help="只使用本地缓存的适配器列表，不访问商店",
+)
+@click.option(
+    "--log-file",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="将安装过程的完整输出追加写入到此文件",
+)
+@click.option(
+    "--trace",
+    "trace_file",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="将各个安装子进程的耗时记录以 Chrome trace 格式导出到此文件",
+)
 @run_async
 async def bootstrap(
     project_name: Optional[str],
     yes: bool,
     verbose: bool,
     venv: Optional[bool],
+    venv_backend: Optional[str],
+    spec_file: Optional[Path],
+    resume: Optional[Path],
+    workers: int,
     adapter: list[str],
+    jobs: int,
+    wheelhouse: Optional[Path],
+    speculative: bool,
+    golden: bool,
+    lock: bool,
+    offline: bool,
+    log_file: Optional[Path],
+    trace_file: Optional[Path],
 ):
+    if spec_file:
+        from .handlers.batch import batch_bootstrap_handler
+
+        await batch_bootstrap_handler(
+            spec_file,
+            verbose=verbose,
+            venv_backend=venv_backend,
+            jobs=jobs,
+            workers=workers,
+            wheelhouse=wheelhouse,
+            offline=offline,
+            log_file=log_file,
+            trace_file=trace_file,
+        )
+        return
+
     from .handlers.bootstrap import bootstrap_handler
 
     await bootstrap_handler(
@@ -37,7 +144,17 @@ async def bootstrap(
         yes=yes,
         verbose=verbose,
         venv=venv,
+        venv_backend=venv_backend,
         adapters=adapter,
+        jobs=jobs,
+        wheelhouse=wheelhouse,
+        lock=lock,
+        speculative=speculative,
+        golden=golden,
+        offline=offline,
+        resume=resume,
+        log_file=log_file,
+        trace_file=trace_file,
     )
 
 
@@ -48,11 +165,95 @@ async def bootstrap(
 )
 @click.option("-y", "--yes", is_flag=True, help="全部使用默认选项")
 @click.option("-v", "--verbose", is_flag=True, help="显示更多输出")
+@click.option(
+    "--check",
+    "--outdated",
+    "check",
+    is_flag=True,
+    help="仅检查并列出可更新的包，不进行更新",
+)
+@click.option(
+    "--sync",
+    is_flag=True,
+    help=f"跳过依赖解析，直接按项目中的 {LOCKFILE_NAME} 安装依赖",
+)
+@click.option(
+    "--rollback",
+    "rollback_id",
+    is_flag=False,
+    flag_value="",
+    default=None,
+    metavar="[ID]",
+    help="回滚到指定更新快照之前的版本，不指定 ID 时回滚最近一次更新",
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    help="更新后检查所有适配器和插件能否正常导入，失败时可回滚",
+)
+@click.option(
+    "--verify-timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=30,
+    show_default=True,
+    help="检查导入时每个模块的超时时间（秒）",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="并发下载、解析的最大任务数",
+)
+@click.option(
+    "--wheelhouse",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help="存放预先下载的 wheel 的目录，默认使用全局共享目录",
+)
+@click.option(
+    "--log-file",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="将安装过程的完整输出追加写入到此文件",
+)
+@click.option(
+    "--trace",
+    "trace_file",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="将各个安装子进程的耗时记录以 Chrome trace 格式导出到此文件",
+)
 @run_async
-async def update_project(yes: bool, verbose: bool):
+async def update_project(
+    yes: bool,
+    verbose: bool,
+    check: bool,
+    sync: bool,
+    rollback_id: Optional[str],
+    verify: bool,
+    verify_timeout: float,
+    jobs: int,
+    wheelhouse: Optional[Path],
+    log_file: Optional[Path],
+    trace_file: Optional[Path],
+):
     from .handlers.update_project import update_project_handler
 
-    await update_project_handler(yes=yes, verbose=verbose)
+    await update_project_handler(
+        yes=yes,
+        verbose=verbose,
+        check=check,
+        sync=sync,
+        jobs=jobs,
+        wheelhouse=wheelhouse,
+        log_file=log_file,
+        trace_file=trace_file,
+        rollback_id=rollback_id,
+        verify=verify,
+        verify_timeout=verify_timeout,
+    )
 
 
 @click.group(
@@ -61,11 +262,22 @@ async def update_project(yes: bool, verbose: bool):
     help="更改 pip 使用的 PyPI 镜像源",
 )
 @click.option("-v", "--verbose", is_flag=True, help="显示更多输出")
+@click.option(
+    "--probe",
+    is_flag=True,
+    help="先测试各镜像源的连接延迟与下载速度，按速度排序供选择",
+)
+@click.option(
+    "--failover",
+    "chain",
+    is_flag=True,
+    help="配置安装时网络出错后依次换用的备用镜像源，同时适用于 pip 与 uv",
+)
 @run_async
-async def pip_index(verbose: bool):
+async def pip_index(verbose: bool, probe: bool, chain: bool):
     from .handlers.pip_index import pip_index_handler
 
-    await pip_index_handler(verbose=verbose)
+    await pip_index_handler(verbose=verbose, probe=probe, chain=chain)
 
 
 @click.group(
@@ -0,0 +1,186 @@
+import difflib
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import click
+import httpx
+from cookit.pyd import type_dump_json, type_validate_json, type_validate_python
+from nb_cli.config import Adapter
+from packaging.utils import canonicalize_name
+from pydantic import BaseModel
+
+from .const import CACHE_DIR
+from .fs import atomic_write_text
+
+REGISTRY_CACHE_PATH = CACHE_DIR / "adapters.json"
+REGISTRY_URLS = (
+    "https://registry.nonebot.dev/adapters.json",
+    "https://cdn.jsdelivr.net/gh/nonebot/registry@results/adapters.json",
+)
+REGISTRY_TTL = 6 * 60 * 60
+ADAPTER_MODULE_PREFIX = "nonebot.adapters."
+FUZZY_CUTOFF = 0.75
+
+
+class RegistryCache(BaseModel):
+    url: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0
+    data: list[dict[str, Any]] = []
+
+    @property
+    def expired(self) -> bool:
+        return time.time() - self.fetched_at > REGISTRY_TTL
+
+
+def load_registry_cache() -> Optional[RegistryCache]:
+    try:
+        return type_validate_json(
+            RegistryCache,
+            REGISTRY_CACHE_PATH.read_text("u8"),
+        )
+    except Exception:
+        return None
+
+
+def save_registry_cache(cache: RegistryCache):
+    try:
+        atomic_write_text(REGISTRY_CACHE_PATH, type_dump_json(cache))
+    except OSError:
+        pass
+
+
+async def fetch_registry(cached: Optional[RegistryCache]) -> Optional[RegistryCache]:
+    async with httpx.AsyncClient(timeout=10, follow_redirects=True) as client:
+        for url in REGISTRY_URLS:
+            headers = {}
+            if cached and cached.url == url:
+                if cached.etag:
+                    headers["If-None-Match"] = cached.etag
+                if cached.last_modified:
+                    headers["If-Modified-Since"] = cached.last_modified
+            try:
+                resp = await client.get(url, headers=headers)
+            except httpx.HTTPError:
+                continue
+
+            if resp.status_code == 304 and cached:
+                cached.fetched_at = time.time()
+                return cached
+            if resp.status_code != 200:
+                continue
+            try:
+                data = resp.json()
+            except ValueError:
+                continue
+            if not isinstance(data, list):
+                continue
+            return RegistryCache(
+                url=url,
+                etag=resp.headers.get("ETag"),
+                last_modified=resp.headers.get("Last-Modified"),
+                fetched_at=time.time(),
+                data=data,
+            )
+    return None
+
+
+def parse_adapters(data: list[dict[str, Any]]) -> list[Adapter]:
+    adapters: list[Adapter] = []
+    for x in data:
+        try:
+            adapters.append(type_validate_python(Adapter, x))
+        except Exception:
+            continue  # 跳过与当前 nb-cli 版本不兼容的条目
+    return adapters
+
+
+async def load_adapters(offline: bool = False) -> list[Adapter]:
+    cached = load_registry_cache()
+    if cached and (offline or not cached.expired):
+        return parse_adapters(cached.data)
+    if offline:
+        click.secho("没有已缓存的适配器列表，请先在联网时运行一次", fg="yellow")
+        return []
+
+    if fetched := await fetch_registry(cached):
+        save_registry_cache(fetched)
+        return parse_adapters(fetched.data)
+    if cached:
+        click.secho("获取适配器列表失败，使用已过期的缓存", fg="yellow")
+        return parse_adapters(cached.data)
+
+    # 最后交给 nb-cli 自己的镜像列表
+    from nb_cli.handlers.adapter import list_adapters
+
+    return await list_adapters()
+
+
+def get_adapter_keys(adapter: Adapter) -> list[str]:
+    module_name = adapter.module_name.lower()
+    keys = [
+        adapter.name.lower(),
+        module_name,
+        canonicalize_name(adapter.project_link),
+    ]
+    if module_name.startswith(ADAPTER_MODULE_PREFIX):
+        keys.append(module_name[len(ADAPTER_MODULE_PREFIX) :])
+    return keys
+
+
+class AmbiguousAdapterError(ValueError):
+    def __init__(self, query: str, candidates: list[Adapter]):
+        self.query = query
+        self.candidates = candidates
+        names = "、".join(x.name for x in candidates)
+        super().__init__(f"{query} 可能指多个适配器：{names}，请写出更完整的名称")
+
+
+@dataclass
+class AdapterMatch:
+    adapter: Adapter
+    key: str
+    exact: bool
+
+
+@dataclass
+class AdapterIndex:
+    keys: dict[str, Adapter] = field(default_factory=dict)
+    sorted_keys: list[str] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, adapters: list[Adapter]) -> "AdapterIndex":
+        keys: dict[str, Adapter] = {}
+        for adapter in adapters:
+            for key in get_adapter_keys(adapter):
+                keys.setdefault(key, adapter)  # 重名时以注册表中靠前的为准
+        return cls(keys, sorted(keys))
+
+    def lookup(self, query: str) -> Optional[AdapterMatch]:
+        query = query.strip().lower()
+        if not query:
+            return None
+        for key in (query, canonicalize_name(query)):
+            if adapter := self.keys.get(key):
+                return AdapterMatch(adapter, key, exact=True)
+
+        # 前缀只对应一个适配器时才采用，避免随意挑一个
+        prefixed = [x for x in self.sorted_keys if x.startswith(query)]
+        if prefixed:
+            candidates = list(
+                {(a := self.keys[x]).module_name: a for x in prefixed}.values(),
+            )
+            if len(candidates) > 1:
+                raise AmbiguousAdapterError(query, candidates)
+            return AdapterMatch(candidates[0], prefixed[0], exact=False)
+
+        if close := difflib.get_close_matches(
+            query,
+            self.sorted_keys,
+            n=1,
+            cutoff=FUZZY_CUTOFF,
+        ):
+            return AdapterMatch(self.keys[close[0]], close[0], exact=False)
+        return None
@@ -0,0 +1,103 @@
+import os
+import shutil
+from functools import cache
+from pathlib import Path, PurePosixPath
+from typing import Any, Optional
+
+import jinja2
+
+from .const import CACHE_DIR
+
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+BOOTSTRAP_TEMPLATE_DIR = TEMPLATES_DIR / "bootstrap"
+TEMPLATE_CACHE_DIR = CACHE_DIR / "templates"
+
+
+@cache
+def get_template_environment(template_dir: Path) -> jinja2.Environment:
+    bytecode_cache: Optional[jinja2.BytecodeCache] = None
+    try:
+        TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        pass
+    else:
+        # 按模板内容校验，模板更新后会自动重新编译
+        bytecode_cache = jinja2.FileSystemBytecodeCache(str(TEMPLATE_CACHE_DIR))
+    return jinja2.Environment(
+        loader=jinja2.FileSystemLoader(template_dir, encoding="u8"),
+        undefined=jinja2.StrictUndefined,
+        keep_trailing_newline=True,
+        bytecode_cache=bytecode_cache,
+    )
+
+
+@cache
+def list_template_files(template_dir: Path) -> list[str]:
+    files: list[str] = []
+    for root, dirs, names in os.walk(template_dir):
+        dirs[:] = sorted(x for x in dirs if x != "__pycache__")
+        root_path = Path(root)
+        files.extend(
+            (root_path / x).relative_to(template_dir).as_posix() for x in sorted(names)
+        )
+    return files
+
+
+@cache
+def get_path_template(template_dir: Path, name: str) -> jinja2.Template:
+    return get_template_environment(template_dir).from_string(name)
+
+
+def get_newline(path: Path) -> str:
+    with path.open("rb") as f:
+        return "\r\n" if f.readline().endswith(b"\r\n") else "\n"
+
+
+# 原来 post_gen_project 钩子中删除的文件，现在直接不渲染
+def should_render_file(path: PurePosixPath, variables: dict[str, Any]) -> bool:
+    if path.suffix in (".sh", ".bat"):
+        if not variables["use_run_script"]:
+            return False
+        return path.suffix == (".bat" if variables["is_windows"] else ".sh")
+    if path.parts[-3:] == ("src", "plugins", "ping.py"):
+        return bool(variables["use_ping"])
+    return True
+
+
+def render_bootstrap_template(
+    variables: dict[str, Any],
+    packages: list[str],
+    output_dir: Path,
+    overwrite_if_exists: bool = False,
+) -> Path:
+    template_dir = BOOTSTRAP_TEMPLATE_DIR
+    env = get_template_environment(template_dir)
+    nonebot = {**variables, "packages": packages}
+    context = {
+        "cookiecutter": {
+            "nonebot": nonebot,
+            "computed": {"project_slug": nonebot["project_name"].replace(" ", "-")},
+        },
+    }
+
+    targets = [
+        (name, PurePosixPath(get_path_template(template_dir, name).render(context)))
+        for name in list_template_files(template_dir)
+    ]
+    project_dir = output_dir / targets[0][1].parts[0]
+    if project_dir.exists() and (not overwrite_if_exists):
+        raise FileExistsError(f"{project_dir} 已存在")
+
+    for name, target in targets:
+        src = template_dir / name
+        dst = output_dir / target
+        dst.parent.mkdir(parents=True, exist_ok=True)  # 文件不渲染时也保留文件夹
+        if not should_render_file(target, nonebot):
+            continue
+        # jinja 会把换行统一成 \n，这里保持和模板文件相同
+        with dst.open("w", encoding="u8", newline=get_newline(src)) as f:
+            f.write(env.get_template(name).render(context))
+        shutil.copymode(src, dst)
+        if target.suffix == ".sh":
+            dst.chmod(0o755)
+    return project_dir
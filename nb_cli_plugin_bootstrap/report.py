@@ -0,0 +1,146 @@
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from .utils import normalize_pkg_name
+
+PIP_FETCH_LINE_REGEX = re.compile(
+    r"^\s*(?P<action>Downloading|Using cached)\s+(?P<file>\S+)"
+    r"\s+\((?P<size>[\d.]+)\s*(?P<unit>[kKMG]?i?B|bytes)\)",
+)
+UV_FETCH_LINE_REGEX = re.compile(
+    r"^\s*Downloading\s+(?P<name>\S+)\s+\((?P<size>[\d.]+)\s*(?P<unit>[kKMG]?i?B)\)",
+)
+UV_INSTALLED_LINE_REGEX = re.compile(r"^\s*\+\s+(?P<name>[^=\s]+)==(?P<version>\S+)")
+SIZE_UNITS = {
+    "bytes": 1,
+    "B": 1,
+    "kB": 1000,
+    "KB": 1000,
+    "MB": 1000**2,
+    "GB": 1000**3,
+    "KiB": 1024,
+    "MiB": 1024**2,
+    "GiB": 1024**3,
+}
+
+
+def parse_size(size: str, unit: str) -> int:
+    return int(float(size) * SIZE_UNITS.get(unit, 1))
+
+
+# wheel 与 sdist 的文件名都以 “项目名-版本” 开头
+def get_filename_project(filename: str) -> str:
+    if filename.endswith(".whl"):
+        return normalize_pkg_name(filename.split("-", maxsplit=1)[0])
+    return normalize_pkg_name(filename.rsplit("-", maxsplit=1)[0])
+
+
+def format_size(size: int) -> str:
+    for unit in ("GB", "MB", "kB"):
+        if size >= (base := SIZE_UNITS[unit]):
+            return f"{size / base:.1f} {unit}"
+    return f"{size} B"
+
+
+@dataclass
+class ReportedPackage:
+    name: str
+    version: str
+    requested: bool = False
+    filename: Optional[str] = None
+    size: Optional[int] = None
+    cached: Optional[bool] = None
+
+
+@dataclass
+class InstallReport:
+    packages: dict[str, ReportedPackage] = field(default_factory=dict)
+    # 文件名 -> (大小, 是否使用了缓存)，由 pip 输出逐行收集
+    fetched: dict[str, tuple[int, bool]] = field(default_factory=dict)
+
+    @property
+    def versions(self) -> dict[str, str]:
+        return {k: v.version for k, v in self.packages.items()}
+
+    @property
+    def download_size(self) -> int:
+        return sum(x.size or 0 for x in self.packages.values() if not x.cached)
+
+    @property
+    def cached_count(self) -> int:
+        return sum(1 for x in self.packages.values() if x.cached)
+
+    @property
+    def fetch_known(self) -> bool:
+        return any(x.cached is not None for x in self.packages.values())
+
+    def feed_pip_line(self, line: str):
+        if m := PIP_FETCH_LINE_REGEX.match(line):
+            filename = m["file"].rsplit("/", maxsplit=1)[-1]
+            size = parse_size(m["size"], m["unit"])
+            self.fetched[filename] = (size, m["action"] == "Using cached")
+
+    def feed_uv_line(self, line: str):
+        if m := UV_INSTALLED_LINE_REGEX.match(line):
+            name = normalize_pkg_name(m["name"])
+            pkg = self.packages.setdefault(name, ReportedPackage(name, m["version"]))
+            pkg.version = m["version"]
+            return
+        if m := UV_FETCH_LINE_REGEX.match(line):
+            name = normalize_pkg_name(m["name"])
+            pkg = self.packages.setdefault(name, ReportedPackage(name, ""))
+            pkg.size = parse_size(m["size"], m["unit"])
+            pkg.cached = False
+
+    def load_pip_report(self, data: dict[str, Any]):
+        for item in data.get("install", []):
+            metadata = item.get("metadata", {})
+            if not (
+                (name := metadata.get("name")) and (ver := metadata.get("version"))
+            ):
+                continue
+            name = normalize_pkg_name(name)
+            url: str = item.get("download_info", {}).get("url", "")
+            filename = url.rsplit("/", maxsplit=1)[-1] or None
+            size, cached = self.fetched.get(filename or "", (None, None))
+            self.packages[name] = ReportedPackage(
+                name,
+                ver,
+                requested=item.get("requested", False),
+                filename=filename,
+                size=size,
+                cached=cached,
+            )
+
+    def load_pip_report_file(self, path: Path):
+        try:
+            data = json.loads(path.read_text("u8"))
+        except (OSError, ValueError):
+            return
+        self.load_pip_report(data)
+
+    # 从 wheelhouse 离线安装时报告里没有下载信息，用下载 wheel 时的输出补上
+    # 从 sdist 构建的 wheel 文件名对不上，按项目名匹配
+    # 都没有记录的（如本地文件源）不确定是否下载过
+    def merge_fetched(self, fetched: dict[str, tuple[int, bool]]):
+        self.fetched.update(fetched)
+        projects = {get_filename_project(k): v for k, v in self.fetched.items()}
+        for pkg in self.packages.values():
+            pkg.size, pkg.cached = (
+                self.fetched.get(pkg.filename or "")
+                or projects.get(pkg.name)
+                or (None, None)
+            )
+
+    # uv 没有 --report，只能从输出中读取安装的包
+    def finish_uv_output(self, requested: list[str]):
+        self.packages = {k: v for k, v in self.packages.items() if v.version}
+        for pkg in self.packages.values():
+            if pkg.cached is None:  # 安装了但没有下载，说明用的是缓存
+                pkg.cached = True
+        for name in requested:
+            if pkg := self.packages.get(normalize_pkg_name(name)):
+                pkg.requested = True
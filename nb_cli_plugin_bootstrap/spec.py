@@ -0,0 +1,58 @@
+from pathlib import Path
+from typing import Optional
+
+import tomlkit
+from cookit.pyd import type_validate_python
+from pydantic import BaseModel, Field, ValidationError
+
+from .utils import validate_ip_v_any_addr
+
+DEFAULT_COMMAND_START = ["", "/", "#"]
+DEFAULT_COMMAND_SEP = [".", " "]
+
+
+# 与 prompt_bootstrap_context 中询问的内容一一对应，默认值与 -y 相同
+class ProjectSpec(BaseModel):
+    name: str
+    adapters: list[str] = []
+    superusers: list[str] = []
+    nickname: list[str] = []
+    command_start: list[str] = DEFAULT_COMMAND_START
+    command_sep: list[str] = DEFAULT_COMMAND_SEP
+    host: str = "127.0.0.1"
+    port: int = Field(8080, ge=1, le=65535)
+    run_script: bool = True
+    redirect_localstore: bool = True
+    ping: bool = True
+    logpile: bool = True
+    builtin_plugins: list[str] = []
+    venv: bool = True
+    python: Optional[str] = None
+    golden: bool = False
+    lock: bool = False
+
+
+# [defaults] 中的值会作为每个 [[projects]] 的默认值
+def load_spec(path: Path) -> list[ProjectSpec]:
+    try:
+        data = tomlkit.parse(path.read_text("u8")).unwrap()
+    except Exception as e:
+        raise ValueError(f"读取配置文件 {path} 失败：{e}") from e
+
+    defaults = data.get("defaults", {})
+    projects = data.get("projects", [])
+    if not isinstance(defaults, dict) or not isinstance(projects, list):
+        raise ValueError("配置文件格式错误，应包含 [defaults] 与 [[projects]]")
+    if not projects:
+        raise ValueError("配置文件中没有任何项目")
+
+    specs: list[ProjectSpec] = []
+    for i, project in enumerate(projects, 1):
+        try:
+            spec = type_validate_python(ProjectSpec, {**defaults, **project})
+        except ValidationError as e:
+            raise ValueError(f"第 {i} 个项目配置有误：\n{e}") from e
+        if not validate_ip_v_any_addr(spec.host):
+            raise ValueError(f"项目 {spec.name} 的监听地址 {spec.host} 格式不正确")
+        specs.append(spec)
+    return specs
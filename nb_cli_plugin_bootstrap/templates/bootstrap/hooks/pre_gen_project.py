@@ -1,5 +0,0 @@
-"""
-{{ cookiecutter.nonebot.update({ "adapters": cookiecutter.nonebot.adapters | unjsonify }) }}
-{{ cookiecutter.nonebot.update({ "plugins": cookiecutter.nonebot.plugins | unjsonify }) }}
-{{ cookiecutter.nonebot.update({ "packages": cookiecutter.nonebot.packages | unjsonify }) }}
-"""
@@ -0,0 +1,184 @@
+import json
+import os
+import time
+import unicodedata
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import click
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+if TYPE_CHECKING:
+    from asyncio.subprocess import Process
+
+
+def get_children_cpu_time() -> Optional[float]:
+    if not resource:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@dataclass
+class Span:
+    command: list[str]
+    label: Optional[str]
+    start: float
+    end: Optional[float] = None
+    exit_code: Optional[int] = None
+    output_bytes: int = 0
+    # 由子进程累计 CPU 时间的差值得出，有其他进程同时结束时会偏大
+    cpu_time: Optional[float] = None
+    _cpu_start: Optional[float] = field(default=None, repr=False)
+
+    @property
+    def name(self) -> str:
+        return self.label or " ".join([Path(self.command[0]).name, *self.command[1:3]])
+
+    @property
+    def wall_time(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+
+class Tracer:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans: list[Span] = []
+        self._running: dict[int, Span] = {}
+
+    def start(self, proc: "Process", command: Sequence[str], label: Optional[str]):
+        span = Span(
+            [str(x) for x in command],
+            label,
+            time.perf_counter(),
+            _cpu_start=get_children_cpu_time(),
+        )
+        self.spans.append(span)
+        self._running[proc.pid] = span
+
+    def finish(self, proc: "Process", exit_code: int, output_bytes: int):
+        if not (span := self._running.pop(proc.pid, None)):
+            return
+        span.end = time.perf_counter()
+        span.exit_code = exit_code
+        span.output_bytes = output_bytes
+        cpu = get_children_cpu_time()
+        if span._cpu_start is not None and cpu is not None:
+            span.cpu_time = cpu - span._cpu_start
+
+    def slowest_labels(self, count: int = 5) -> list[tuple[str, float, int]]:
+        totals: dict[str, tuple[float, int]] = {}
+        for span in self.spans:
+            if span.label and span.end:
+                total, num = totals.get(span.label, (0, 0))
+                totals[span.label] = (total + span.wall_time, num + 1)
+        return sorted(
+            ((k, total, num) for k, (total, num) in totals.items()),
+            key=lambda x: x[1],
+            reverse=True,
+        )[:count]
+
+    # Chrome trace 格式，可在 chrome://tracing 或 Perfetto 中打开
+    def to_chrome_trace(self) -> dict:
+        events = []
+        lanes: list[float] = []  # 每条轨道上最后一个 span 的结束时间
+        for span in sorted(self.spans, key=lambda x: x.start):
+            end = span.end or time.perf_counter()
+            lane = next((i for i, x in enumerate(lanes) if x <= span.start), None)
+            if lane is None:
+                lane = len(lanes)
+                lanes.append(end)
+            else:
+                lanes[lane] = end
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": "subprocess",
+                    "ph": "X",
+                    "ts": (span.start - self.origin) * 1e6,
+                    "dur": (end - span.start) * 1e6,
+                    "pid": os.getpid(),
+                    "tid": lane,
+                    "args": {
+                        "command": span.command,
+                        "exit_code": span.exit_code,
+                        "output_bytes": span.output_bytes,
+                        "cpu_time": span.cpu_time,
+                    },
+                },
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: Path):
+        path.write_text(json.dumps(self.to_chrome_trace(), ensure_ascii=False), "u8")
+
+
+_tracer: ContextVar[Optional[Tracer]] = ContextVar("tracer", default=None)
+_span_label: ContextVar[Optional[str]] = ContextVar("span_label", default=None)
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer.get()
+
+
+# 总是记录耗时用于显示最慢的包，只在指定了文件时导出
+@contextmanager
+def tracing(path: Optional[Path]) -> Iterator[Tracer]:
+    tracer = Tracer()
+    token = _tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _tracer.reset(token)
+        if path:
+            tracer.export(path)
+            click.secho(f"已将耗时记录导出到 {path}", fg="bright_black")
+
+
+@contextmanager
+def span_label(label: Optional[str]) -> Iterator[None]:
+    token = _span_label.set(label)
+    try:
+        yield
+    finally:
+        _span_label.reset(token)
+
+
+def packages_label(packages: Sequence[str]) -> str:
+    return packages[0] if len(packages) == 1 else f"批量（{len(packages)} 个包）"
+
+
+def trace_process(proc: "Process", command: Sequence[str]):
+    if tracer := _tracer.get():
+        tracer.start(proc, command, _span_label.get())
+
+
+def finish_process(proc: "Process", exit_code: int, output_bytes: int):
+    if tracer := _tracer.get():
+        tracer.finish(proc, exit_code, output_bytes)
+
+
+def get_display_width(text: str) -> int:
+    return sum(2 if unicodedata.east_asian_width(x) in "WF" else 1 for x in text)
+
+
+def style_slowest_labels(count: int = 5) -> Optional[str]:
+    if not ((tracer := _tracer.get()) and (slowest := tracer.slowest_labels(count))):
+        return None
+    title = click.style("耗时最长的包：", fg="bright_blue", bold=True)
+    width = max(get_display_width(x[0]) for x in slowest)
+    lines = "\n".join(
+        f"  {label}{' ' * (width - get_display_width(label))} "
+        f"{click.style(f'{total:.2f}s', fg='cyan')}"
+        f"（{num} 个进程）"
+        for label, total, num in slowest
+    )
+    return f"{title}\n{lines}"
@@ -1,10 +1,15 @@
 import asyncio
+import codecs
 import json
 import locale
+import re
 import sys
-from io import StringIO
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
 from pathlib import Path
-from typing import TYPE_CHECKING, Optional, TextIO, Union
+from typing import TYPE_CHECKING, Any, Callable, Optional, TextIO, Union
 from typing_extensions import TypeAlias
 
 from nb_cli.compat import type_validate_python
@@ -12,20 +17,45 @@ from nb_cli.handlers import get_default_python
 from nb_cli.handlers.pip import call_pip
 from pydantic import AnyHttpUrl, BaseModel, IPvAnyAddress, ValidationError
 
+from .discovery import find_tool, probe
+from .metadata import read_installed_distributions
+from .trace import finish_process, trace_process
+
 if TYPE_CHECKING:
     from asyncio.subprocess import Process
 
+    from .report import InstallReport
+
 InstallInfoType: TypeAlias = Union["SuccessInstallInfo", "FailInstallInfo"]
 
 ENC = locale.getpreferredencoding()
+OUTPUT_TAIL_SIZE = 64 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+# pip 与 uv 连接不上源时的输出，出现这些错误时可以换一个源重试
+NETWORK_ERROR_MARKERS = (
+    "ConnectTimeoutError",
+    "ReadTimeoutError",
+    "ConnectionError",
+    "Could not fetch URL",
+    "error sending request",  # uv
+    "operation timed out",  # uv
+    "dns error",  # uv
+)
+
+PIP_NOT_FOUND_TEXT = "No matching distribution found for "
+# uv 找不到包时也会输出 No solution found when resolving，需要先于冲突判断
+UV_NOT_FOUND_REGEX = re.compile(r"(\S+) was not found in the package registry")
+
+_spool_file: ContextVar[Optional[TextIO]] = ContextVar("spool_file", default=None)
 
 
 class SuccessInstallInfo:
-    def __init__(self, name: str, stdout: str, stderr: str):
+    def __init__(self, name: str, stdout: str, stderr: str, report: "InstallReport"):
         self.name = name
         self.stdout = stdout
         self.stderr = stderr
-        self.packages = self._parse_packages()
+        self.report = report
+        self.packages = report.versions
 
     @property
     def version(self) -> Optional[str]:
@@ -35,13 +65,6 @@ class SuccessInstallInfo:
     def packages_without_self(self) -> dict[str, str]:
         return {k: v for k, v in self.packages.items() if k != self.name}
 
-    def _parse_packages(self) -> dict[str, str]:
-        suc_out = "Successfully installed "
-        if (out_index := self.stdout.rfind(suc_out)) == -1:
-            return {}
-        packages_str = self.stdout[out_index + len(suc_out) :].split()
-        return dict(pkg_str.rsplit("-", maxsplit=1) for pkg_str in packages_str)
-
 
 class FailInstallInfo:
     def __init__(self, name: str, stdout: str, stderr: str):
@@ -50,6 +73,14 @@ class FailInstallInfo:
         self.stderr = stderr
         self.reason = self._parse_reason()
 
+    @property
+    def is_conflict(self) -> bool:
+        return is_conflict_output(self.stderr)
+
+    @property
+    def is_network_error(self) -> bool:
+        return is_network_error_output(self.stderr)
+
     def _parse_reason(self) -> Optional[str]:
         if "ConnectTimeoutError" in self.stderr:
             return "请求超时，请检查网络环境"
@@ -59,18 +90,51 @@ class FailInstallInfo:
             return "出现 SSL 相关问题，如果你正在使用代理，请切换节点后重试"
         if "WinError 5" in self.stderr:
             return "拒绝访问，可能是文件被占用，请关掉 NoneBot 后重试"
-        if "ResolutionImpossible" in self.stderr:
-            return "包版本冲突"
-
-        nf_out = "No matching distribution found for "
-        if (nf_index := self.stderr.find(nf_out)) != -1:
-            index = nf_index + len(nf_out)
-            pkg = self.stderr[index:].strip()
+        if pkg := parse_not_found_package(self.stderr):
             return f"包 {pkg} 不存在，可能是插件 Import 包名与 PyPI 项目名不一致，请自行手动解决"
+        if self.is_conflict:
+            detail = parse_conflict_detail(self.stderr)
+            return f"包版本冲突：{detail}" if detail else "包版本冲突"
 
         return "未知原因"
 
 
+def parse_not_found_package(stderr: str) -> Optional[str]:
+    if (index := stderr.find(PIP_NOT_FOUND_TEXT)) != -1:
+        return stderr[index + len(PIP_NOT_FOUND_TEXT) :].strip() or None
+    if m := UV_NOT_FOUND_REGEX.search(stderr):
+        return m[1]
+    return None
+
+
+def is_conflict_output(stderr: str) -> bool:
+    if UV_NOT_FOUND_REGEX.search(stderr):
+        return False
+    return ("ResolutionImpossible" in stderr) or (
+        "No solution found when resolving" in stderr  # uv
+    )
+
+
+def is_network_error_output(stderr: str) -> bool:
+    return any(x in stderr for x in NETWORK_ERROR_MARKERS)
+
+
+def parse_conflict_detail(stderr: str) -> Optional[str]:
+    pip_title = "The conflict is caused by:"
+    if (index := stderr.find(pip_title)) != -1:
+        lines: list[str] = []
+        for line in stderr[index + len(pip_title) :].lstrip("\r\n").splitlines():
+            if not line.strip():
+                break
+            lines.append(line.strip())
+        return "; ".join(lines) or None
+
+    if (index := stderr.find("Because ")) != -1:  # uv
+        return " ".join(stderr[index:].split("\n\n", maxsplit=1)[0].split())
+
+    return None
+
+
 def decode(s: bytes) -> str:
     try:
         return s.decode()
@@ -78,81 +142,197 @@ def decode(s: bytes) -> str:
         return s.decode(ENC, errors="replace")
 
 
+async def create_process_simp(*args: str) -> "Process":
+    proc = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    trace_process(proc, args)
+    return proc
+
+
+async def use_uv(force_no_uv: bool = False) -> bool:
+    return (not force_no_uv) and await uv_exists()
+
+
 async def call_pip_simp(
     command: str,
     *pip_args: str,
     python_path: Optional[str] = None,
     force_no_uv: bool = False,
+    index_url: Optional[str] = None,
 ) -> "Process":
-    if (not await uv_exists()) or force_no_uv:
-        return await call_pip(
+    if index_url:  # pip 与 uv 的参数相同，会覆盖配置文件与环境变量中的源
+        pip_args = (*pip_args, "--index-url", index_url)
+    if not await use_uv(force_no_uv):
+        proc = await call_pip(
             [command, *pip_args],
             python_path=python_path,
             stdin=asyncio.subprocess.DEVNULL,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
         )
+        trace_process(proc, [python_path or "python", "-m", "pip", command, *pip_args])
+        return proc
 
     if python_path is None:
         python_path = await get_default_python()
-    return await asyncio.create_subprocess_exec(
-        *("uv", "pip", command, "-p", python_path, *pip_args),
-        stdin=asyncio.subprocess.DEVNULL,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
+    return await create_process_simp("uv", "pip", command, "-p", python_path, *pip_args)
 
 
 async def call_pip_update_simp(
     *pip_args: str,
     python_path: Optional[str] = None,
     force_no_uv: bool = False,
+    index_url: Optional[str] = None,
 ) -> "Process":
     return await call_pip_simp(
         *("install", "--upgrade", *pip_args),
         python_path=python_path,
         force_no_uv=force_no_uv,
+        index_url=index_url,
     )
 
 
+class StreamDecoder:
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._fallback = False
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        if not self._fallback:
+            try:
+                return self._decoder.decode(data, final)
+            except UnicodeDecodeError:  # 不是 UTF-8，之后都用系统编码解码
+                pending, _ = self._decoder.getstate()
+                data = pending + data
+                self._fallback = True
+                self._decoder = codecs.getincrementaldecoder(ENC)(errors="replace")
+        return self._decoder.decode(data, final)
+
+
+class OutputCapture:
+    def __init__(
+        self,
+        outer: Optional[TextIO] = None,
+        spool: Optional[TextIO] = None,
+        on_line: Optional[Callable[[str], Any]] = None,
+        tail_size: int = OUTPUT_TAIL_SIZE,
+    ):
+        self.outer = outer
+        self.spool = spool
+        self.on_line = on_line
+        self.tail_size = tail_size
+        self.truncated = False
+        self.size = 0
+        self._decoder = StreamDecoder()
+        self._tail: deque[str] = deque()
+        self._tail_len = 0
+        self._line_buf = ""
+
+    @property
+    def text(self) -> str:
+        return "".join(self._tail)
+
+    def _append_tail(self, text: str):
+        self._tail.append(text)
+        self._tail_len += len(text)
+        while self._tail_len > self.tail_size:
+            self.truncated = True
+            overflow = self._tail_len - self.tail_size
+            if len(self._tail[0]) <= overflow:
+                self._tail_len -= len(self._tail.popleft())
+            else:
+                self._tail[0] = self._tail[0][overflow:]
+                self._tail_len -= overflow
+
+    def _feed_lines(self, text: str, final: bool):
+        assert self.on_line
+        *lines, self._line_buf = (self._line_buf + text).split("\n")
+        if final and self._line_buf:
+            lines.append(self._line_buf)
+            self._line_buf = ""
+        for line in lines:
+            self.on_line(line.rstrip("\r"))
+
+    def feed(self, data: bytes, final: bool = False):
+        self.size += len(data)
+        text = self._decoder.decode(data, final)
+        if self.outer:
+            self.outer.write(text)
+        if self.spool:
+            self.spool.write(text)
+        if self.on_line:
+            self._feed_lines(text, final)
+        if text:
+            self._append_tail(text)
+
+
 async def read_stream(
     stream: Optional[asyncio.StreamReader],
-    outer: Optional[TextIO] = None,
+    capture: OutputCapture,
 ) -> str:
     if not stream:
         return ""
 
-    cached_io = StringIO()
-    async for data in stream:
-        data_str = decode(data)
-        cached_io.write(data_str)
-        if outer:
-            outer.write(data_str)
+    while data := await stream.read(STREAM_CHUNK_SIZE):
+        capture.feed(data)
+    capture.feed(b"", final=True)
+    return capture.text
 
-    return cached_io.getvalue()
 
+@contextmanager
+def spool_output(path: Optional[Path]) -> Iterator[None]:
+    if not path:
+        yield
+        return
+    with path.open("a", encoding="u8") as f:
+        token = _spool_file.set(f)
+        try:
+            yield
+        finally:
+            _spool_file.reset(token)
 
+
+# 只在内存中保留输出的末尾部分，完整输出可以通过 spool_output 写入文件
 async def wait(
     proc: asyncio.subprocess.Process,
     verbose: bool = False,
+    on_stdout_line: Optional[Callable[[str], Any]] = None,
+    on_stderr_line: Optional[Callable[[str], Any]] = None,
 ) -> tuple[int, str, str]:
-    if verbose:
+    spool = _spool_file.get()
+    stdout_capture = OutputCapture(
+        sys.stdout if verbose else None,
+        spool,
+        on_stdout_line,
+    )
+    stderr_capture = OutputCapture(
+        sys.stderr if verbose else None,
+        spool,
+        on_stderr_line,
+    )
+    try:
         stdout, stderr = await asyncio.gather(
-            read_stream(proc.stdout, sys.stdout),
-            read_stream(proc.stderr, sys.stderr),
+            read_stream(proc.stdout, stdout_capture),
+            read_stream(proc.stderr, stderr_capture),
         )
-    else:
-        stdout_b, stderr_b = await proc.communicate()
-        stdout = decode(stdout_b or b"")
-        stderr = decode(stderr_b or b"")
-    return (await proc.wait(), stdout, stderr)
+        code = await proc.wait()
+    except asyncio.CancelledError:  # 后台任务被取消时不留下子进程
+        with suppress(ProcessLookupError):
+            proc.kill()
+        raise
+    finish_process(proc, code, stdout_capture.size + stderr_capture.size)
+    return code, stdout, stderr
 
 
 def normalize_pkg_name(name: str) -> str:
     return name.replace("_", "-").lower()
 
 
-async def list_all_packages(python_path: Optional[str] = None) -> dict[str, str]:
+async def list_all_packages_pip(python_path: Optional[str] = None) -> dict[str, str]:
     proc = await call_pip_simp("list", "--format=json", python_path=python_path)
     return_code = await proc.wait()
     if not return_code == 0:
@@ -162,20 +342,32 @@ async def list_all_packages(python_path: Optional[str] = None) -> dict[str, str]
     return {normalize_pkg_name(x["name"]): x["version"] for x in json.loads(stdout)}
 
 
-async def update_package(
-    pkg: str,
+async def list_all_packages(python_path: Optional[str] = None) -> dict[str, str]:
+    if python_path is None:
+        python_path = await get_default_python()
+    try:
+        dists = await read_installed_distributions(python_path)
+    except Exception:
+        return await list_all_packages_pip(python_path)
+
+    packages: dict[str, str] = {}
+    for name, version in dists:  # 与 pip 一致，同名包以 sys.path 中靠前的为准
+        packages.setdefault(normalize_pkg_name(name), version)
+    return packages
+
+
+async def resolve_packages(
+    *pkgs: str,
     python_path: Optional[str] = None,
-    verbose: bool = False,
-) -> InstallInfoType:
-    if verbose:
-        print()
-    proc = await call_pip_update_simp(pkg, python_path=python_path)
-    return_code, stdout, stderr = await wait(proc, verbose=verbose)
-    return (
-        SuccessInstallInfo(pkg, stdout, stderr)
-        if return_code == 0
-        else FailInstallInfo(pkg, stdout, stderr)
+    index_url: Optional[str] = None,
+) -> tuple[int, str, str]:
+    proc = await call_pip_update_simp(
+        "--dry-run",
+        *pkgs,
+        python_path=python_path,
+        index_url=index_url,
     )
+    return await wait(proc)
 
 
 def validate_ip_v_any_addr(addr: str) -> bool:
@@ -200,41 +392,12 @@ def validate_http_url(url: str) -> bool:
     return True
 
 
-_uv_exists = False
-
-
 async def uv_exists() -> bool:
-    global _uv_exists
-    if _uv_exists:
-        return True
-
-    try:
-        code = await (
-            await asyncio.create_subprocess_exec(
-                *("uv", "--version"),
-                stdin=asyncio.subprocess.DEVNULL,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-        ).wait()
-    except Exception:
-        return False
-    _uv_exists = code == 0
-    return _uv_exists
+    return (await probe(find_tool("uv"), "version", "--version")) is not None
 
 
 async def get_uv_python_path() -> Optional[Path]:
-    if not await uv_exists():
-        return None
-    code, stdout, _ = await wait(
-        await asyncio.create_subprocess_exec(
-            *("uv", "python", "dir"),
-            stdin=asyncio.subprocess.DEVNULL,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        ),
-    )
-    stdout = stdout.strip()
-    if code == 0 and stdout and (p := Path(stdout)).exists():
+    stdout = await probe(find_tool("uv"), "python_dir", "python", "dir")
+    if stdout and (p := Path(stdout)).exists():
         return p
     return None
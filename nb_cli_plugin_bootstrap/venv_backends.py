@@ -0,0 +1,77 @@
+import asyncio
+from collections.abc import Awaitable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+import virtualenv
+from nb_cli.consts import WINDOWS
+
+from .utils import create_process_simp, uv_exists, wait
+
+
+def get_venv_python(venv_dir: Path) -> str:
+    return str(
+        venv_dir
+        / ("Scripts" if WINDOWS else "bin")
+        / ("python.exe" if WINDOWS else "python"),
+    )
+
+
+@dataclass
+class VenvBackend:
+    name: str
+    create: Callable[[Path, str, str], Awaitable[None]]
+    available: Callable[[], Awaitable[bool]]
+
+
+async def always_available() -> bool:
+    return True
+
+
+async def run_venv_command(*args: str):
+    code, _, stderr = await wait(await create_process_simp(*args))
+    if code != 0:
+        raise RuntimeError(f"{' '.join(args[:2])} 运行失败（{code}）\n{stderr}")
+
+
+async def create_venv_uv(venv_dir: Path, python_path: str, prompt: str):
+    # 带上 pip，之后没有 uv 时也能在虚拟环境里正常安装
+    await run_venv_command(
+        *("uv", "venv", "--seed", "--python", python_path),
+        *("--prompt", prompt, str(venv_dir)),
+    )
+
+
+# 参数与 nb-cli 的 create_virtualenv 相同，放到线程里跑，避免卡住同时进行的交互
+async def create_venv_virtualenv(venv_dir: Path, python_path: str, prompt: str):
+    await asyncio.to_thread(
+        virtualenv.cli_run,
+        [
+            *("--no-download", "--no-periodic-update", "--python", python_path),
+            *("--prompt", prompt, str(venv_dir)),
+        ],
+    )
+
+
+async def create_venv_stdlib(venv_dir: Path, python_path: str, prompt: str):
+    await run_venv_command(
+        *(python_path, "-m", "venv", "--prompt", prompt, str(venv_dir)),
+    )
+
+
+# 按速度从快到慢排列
+VENV_BACKENDS = {
+    x.name: x
+    for x in (
+        VenvBackend("uv", create_venv_uv, uv_exists),
+        VenvBackend("virtualenv", create_venv_virtualenv, always_available),
+        VenvBackend("venv", create_venv_stdlib, always_available),
+    )
+}
+
+
+async def select_venv_backends(name: Optional[str] = None) -> list[VenvBackend]:
+    if name:
+        return [VENV_BACKENDS[name]]
+    return [x for x in VENV_BACKENDS.values() if await x.available()]
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Literal, Optional
+
+from .utils import decode
+
+ModuleKind = Literal["adapter", "plugin"]
+
+RESULT_PREFIX = "@@nb-bootstrap-verify@@ "
+WORKER_SCRIPT = f"""
+import importlib, json, sys, time, traceback
+
+def report(**kwargs):
+    print({RESULT_PREFIX!r} + json.dumps(kwargs), flush=True)
+
+try:
+    import nonebot
+    from nonebot.log import logger
+
+    nonebot.init()
+except Exception:
+    report(ready=False, error=traceback.format_exc().strip().splitlines()[-1])
+    sys.exit(1)
+
+errors = []
+logger.add(lambda m: errors.append(str(m)), level="ERROR", format="{{message}}")
+report(ready=True)
+
+for line in sys.stdin:
+    kind, _, name = line.strip().partition(" ")
+    errors.clear()
+    start = time.perf_counter()
+    try:
+        if kind == "adapter":
+            importlib.import_module(name).Adapter
+            ok = True
+        else:
+            ok = nonebot.load_plugin(name) is not None
+    except BaseException:
+        errors.append(traceback.format_exc())
+        ok = False
+    error = None
+    if not ok:
+        lines = [x for x in "".join(errors).splitlines() if x.strip()]
+        error = lines[-1].strip() if lines else "加载失败"
+    report(ok=ok, duration=time.perf_counter() - start, error=error)
+"""
+
+
+@dataclass
+class ImportResult:
+    kind: ModuleKind
+    module: str
+    ok: bool
+    duration: Optional[float] = None
+    error: Optional[str] = None
+
+
+class ImportWorker:
+    def __init__(self, proc: asyncio.subprocess.Process):
+        self.proc = proc
+
+    @classmethod
+    async def start(
+        cls,
+        python_path: str,
+        project_root: Path,
+        timeout: float,
+    ) -> "ImportWorker":
+        proc = await asyncio.create_subprocess_exec(
+            *(python_path, "-c", WORKER_SCRIPT),
+            cwd=project_root,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        worker = cls(proc)
+        try:
+            data = await asyncio.wait_for(worker.read_result(), timeout)
+        except asyncio.TimeoutError:
+            await worker.kill()
+            raise RuntimeError("初始化 NoneBot 超时") from None
+        if not data.get("ready"):
+            await worker.kill()
+            raise RuntimeError(data.get("error") or "初始化 NoneBot 失败")
+        return worker
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.returncode is None
+
+    # 插件可能会在 stdout 输出其他内容，只认带前缀的行
+    async def read_result(self) -> dict[str, Any]:
+        assert self.proc.stdout
+        while line := await self.proc.stdout.readline():
+            text = decode(line).strip()
+            if text.startswith(RESULT_PREFIX):
+                return json.loads(text[len(RESULT_PREFIX) :])
+        raise RuntimeError("进程意外退出")
+
+    async def check(
+        self, kind: ModuleKind, module: str, timeout: float
+    ) -> ImportResult:
+        assert self.proc.stdin
+        self.proc.stdin.write(f"{kind} {module}\n".encode())
+        try:
+            await self.proc.stdin.drain()
+            data = await asyncio.wait_for(self.read_result(), timeout)
+        except asyncio.TimeoutError:
+            await self.kill()
+            return ImportResult(kind, module, ok=False, error=f"导入超时（{timeout}s）")
+        except (RuntimeError, ConnectionError) as e:
+            await self.kill()
+            return ImportResult(kind, module, ok=False, error=str(e))
+        return ImportResult(
+            kind,
+            module,
+            ok=data["ok"],
+            duration=data["duration"],
+            error=data["error"],
+        )
+
+    async def kill(self):
+        if self.alive:
+            self.proc.kill()
+        await self.proc.wait()
+
+    async def close(self):
+        if self.proc.stdin and self.alive:
+            self.proc.stdin.close()
+        try:
+            await asyncio.wait_for(self.proc.wait(), 5)
+        except asyncio.TimeoutError:
+            await self.kill()
+
+
+# 每个工作进程初始化一次 NoneBot 后依次导入分配到的模块，超时的进程会被替换
+async def verify_imports(
+    python_path: str,
+    project_root: Path,
+    adapters: list[str],
+    plugins: list[str],
+    jobs: int = 4,
+    timeout: float = 30,
+) -> list[ImportResult]:
+    queue: asyncio.Queue[tuple[ModuleKind, str]] = asyncio.Queue()
+    for module in adapters:
+        queue.put_nowait(("adapter", module))
+    for module in plugins:
+        queue.put_nowait(("plugin", module))
+    results: list[ImportResult] = []
+    init_error: Optional[str] = None
+
+    async def run_worker():
+        nonlocal init_error
+        worker: Optional[ImportWorker] = None
+        while not queue.empty():
+            kind, module = queue.get_nowait()
+            if init_error:  # NoneBot 都无法初始化，没必要继续尝试
+                results.append(ImportResult(kind, module, False, error=init_error))
+                continue
+            if (not worker) or (not worker.alive):
+                start_time = time.perf_counter()
+                try:
+                    worker = await ImportWorker.start(
+                        python_path,
+                        project_root,
+                        timeout,
+                    )
+                except Exception as e:
+                    init_error = str(e)
+                    duration = time.perf_counter() - start_time
+                    results.append(ImportResult(kind, module, False, duration, str(e)))
+                    continue
+            results.append(await worker.check(kind, module, timeout))
+        if worker:
+            await worker.close()
+
+    await asyncio.gather(*(run_worker() for _ in range(min(jobs, queue.qsize()))))
+    order = {x: i for i, x in enumerate([*adapters, *plugins])}
+    return sorted(results, key=lambda x: order[x.module])
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import tempfile
+import time
+from contextlib import suppress
+from pathlib import Path
+from typing import Optional
+
+from .const import CACHE_DIR
+from .mirrors import run_with_failover
+from .report import InstallReport
+from .trace import span_label
+from .utils import call_pip_simp, is_network_error_output, wait
+
+WHEELHOUSE_DIR = CACHE_DIR / "wheelhouse"
+WHEELHOUSE_TTL = 30 * 24 * 60 * 60
+WHEELHOUSE_MAX_SIZE = 2 * 1024**3
+
+# 每个进程中每个 wheelhouse 只清理一次
+_pruned: set[Path] = set()
+
+
+# 文件的修改时间就是最近一次下载或构建的时间
+# 先删除超过期限的，再从最旧的开始删到总大小不超过上限
+def prune_wheelhouse(
+    wheelhouse: Path = WHEELHOUSE_DIR,
+    ttl: float = WHEELHOUSE_TTL,
+    max_size: int = WHEELHOUSE_MAX_SIZE,
+):
+    files: list[tuple[float, int, Path]] = []
+    with suppress(OSError), os.scandir(wheelhouse) as it:
+        for entry in it:
+            if not entry.is_file():  # 跳过正在构建的临时目录
+                continue
+            with suppress(OSError):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+
+    files.sort(reverse=True)
+    now = time.time()
+    total = 0
+    for mtime, size, path in files:
+        total += size
+        if now - mtime > ttl or total > max_size:
+            with suppress(OSError):
+                path.unlink()
+
+
+async def build_wheels(
+    pkg: str,
+    wheelhouse: Path,
+    python_path: Optional[str] = None,
+    report: Optional[InstallReport] = None,
+    index_url: Optional[str] = None,
+) -> tuple[int, str]:
+    # 先输出到单独的临时目录再移动，避免并发写入同一个文件
+    with tempfile.TemporaryDirectory(dir=wheelhouse) as temp_dir:
+        proc = await call_pip_simp(
+            *("wheel", pkg, "--wheel-dir", temp_dir),
+            *("--find-links", str(wheelhouse)),
+            python_path=python_path,
+            force_no_uv=True,
+            index_url=index_url,
+        )
+        code, _, stderr = await wait(
+            proc,
+            on_stdout_line=report.feed_pip_line if report else None,
+        )
+        if code == 0:
+            for path in Path(temp_dir).iterdir():
+                os.replace(path, wheelhouse / path.name)
+    return code, stderr
+
+
+async def fill_wheelhouse(
+    packages: list[str],
+    wheelhouse: Path = WHEELHOUSE_DIR,
+    python_path: Optional[str] = None,
+    jobs: int = 4,
+    report: Optional[InstallReport] = None,
+) -> list[str]:
+    wheelhouse.mkdir(parents=True, exist_ok=True)
+    # 在下载前清理，不会删掉这次要用的 wheel
+    if wheelhouse not in _pruned:
+        _pruned.add(wheelhouse)
+        prune_wheelhouse(wheelhouse)
+    semaphore = asyncio.Semaphore(jobs)
+
+    async def build(pkg: str) -> bool:
+        async with semaphore:
+            with span_label(pkg):
+                code, _ = await run_with_failover(
+                    lambda index_url: build_wheels(
+                        pkg,
+                        wheelhouse,
+                        python_path,
+                        report,
+                        index_url,
+                    ),
+                    lambda x: x[0] != 0 and is_network_error_output(x[1]),
+                )
+        return code == 0
+
+    results = await asyncio.gather(*(build(x) for x in packages))
+    return [pkg for pkg, ok in zip(packages, results, strict=True) if not ok]